@@ -0,0 +1,171 @@
+"""
+Answer Pipeline Module
+
+This module runs the steps of a LangChain ConversationalRetrievalChain one at a
+time (condense the question, retrieve, answer) so that work can be skipped
+between them: the standalone question and its retrieved chunks are checked
+against a SemanticAnswerCache before the answer LLM is called. Answers can
+also be streamed: retrieval finishes first, then the answer tokens are yielded
+as the LLM generates them, and the condense, retrieval, time-to-first-token and
+generation times of every request are logged separately. Condensing goes
+through a QuestionCondenser, which skips the LLM call for first turns and
+self-contained questions and caches the rewrites.
+"""
+
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import convert_to_messages, get_buffer_string
+from langchain_core.prompts import format_document
+
+from keyword_matcher import KeywordMatcher
+from question_condenser import QuestionCondenser
+from response_cache import stream_cached
+from semantic_cache import CachedAnswer, SemanticAnswerCache
+from streaming import ThrottledStream
+
+
+class AnswerTiming(NamedTuple):
+    """Where the time of one streamed answer went, in seconds."""
+    condense: float
+    retrieval: float
+    time_to_first_token: Optional[float]
+    generation: float
+    tokens: int
+    cached: bool
+
+    def summary(self) -> str:
+        """A one-line report of the request's latency."""
+        ttft = f"{self.time_to_first_token:.2f}s" if self.time_to_first_token is not None else "n/a"
+        source = "semantic cache" if self.cached else f"{self.tokens} tokens generated in {self.generation:.2f}s"
+        return (f"Answer timing: condense {self.condense:.2f}s, retrieval {self.retrieval:.2f}s, "
+                f"time to first token {ttft}, {source}")
+
+
+class AnswerPipeline:
+    """
+    Answers questions with the parts of a ConversationalRetrievalChain and an optional semantic cache.
+    """
+
+    def __init__(self, chain, embeddings: Embeddings, cache: Optional[SemanticAnswerCache] = None,
+                 callbacks: Optional[list] = None, condense_cache_size: int = 1024, skip_self_contained: bool = True,
+                 entities: Optional[KeywordMatcher] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            chain: A ConversationalRetrievalChain; its question_generator, retriever and
+                combine_docs_chain are used, and history is passed in per call
+            embeddings: Embeddings for standalone questions (the cache compares these)
+            cache: Semantic answer cache, or None to always generate
+            callbacks: LangChain callback handlers passed to every step
+            condense_cache_size: Condensed questions remembered per (history, question); 0 disables
+            skip_self_contained: Whether follow-ups judged self-contained skip the condense LLM call
+            entities: Known entity names, which let short questions count as self-contained
+        """
+        self.chain = chain
+        self.embeddings = embeddings
+        self.cache = cache
+        self.config = {"callbacks": callbacks} if callbacks else None
+        self.condenser = QuestionCondenser(self._rewrite, entities, condense_cache_size, skip_self_contained)
+
+    def condense(self, question: str, chat_history: List[Dict[str, str]]) -> str:
+        """Rewrite a follow-up question into a standalone one, unless it is the first or is self-contained."""
+        transcript = get_buffer_string(convert_to_messages(chat_history)) if chat_history else ""
+        return self.condenser.condense(question, transcript)
+
+    def _rewrite(self, question: str, transcript: str) -> str:
+        """Ask the chain's question generator for the standalone question."""
+        result = self.chain.question_generator.invoke({"question": question, "chat_history": transcript}, self.config)
+        return result[self.chain.question_generator.output_key]
+
+    def answer(self, question: str, chat_history: List[Dict[str, str]]) -> str:
+        """
+        Answer a question in the context of a conversation.
+
+        Args:
+            question: The user's message
+            chat_history: Earlier messages of this conversation ({"role", "content"} dicts)
+
+        Returns:
+            The answer
+        """
+        standalone, documents, chunk_ids, vector, cached = self._retrieve(question, chat_history)
+        if cached is not None:
+            return cached.answer
+
+        start = time.perf_counter()
+        result = self.chain.combine_docs_chain.invoke({"input_documents": documents, "question": standalone}, self.config)
+        answer = result[self.chain.combine_docs_chain.output_key]
+        self._remember(standalone, vector, chunk_ids, answer, time.perf_counter() - start)
+        return answer
+
+    def stream(self, question: str, chat_history: List[Dict[str, str]], max_updates_per_second: float = 20.0,
+               min_chars: int = 1) -> Iterator[str]:
+        """
+        Answer a question, yielding the answer as it is generated.
+
+        The question is condensed and its chunks retrieved before anything is yielded; the answer
+        LLM is then called in streaming mode. The timings are printed when the answer is complete.
+
+        Args:
+            question: The user's message
+            chat_history: Earlier messages of this conversation ({"role", "content"} dicts)
+            max_updates_per_second: Upper bound on yields (0 for no time limit)
+            min_chars: Minimum number of new characters per yield
+
+        Yields:
+            Progressively longer prefixes of the answer, ending with the full answer
+        """
+        started_at = time.perf_counter()
+        standalone = self.condense(question, chat_history)
+        condensed_at = time.perf_counter()
+        standalone, documents, chunk_ids, vector, cached = self._retrieve(question, chat_history, standalone)
+        retrieved_at = time.perf_counter()
+
+        if cached is not None:
+            print(AnswerTiming(condensed_at - started_at, retrieved_at - condensed_at,
+                               retrieved_at - started_at, 0.0, 0, True).summary())
+            yield from stream_cached(cached.answer)
+            return
+
+        combine = self.chain.combine_docs_chain
+        context = combine.document_separator.join(format_document(document, combine.document_prompt)
+                                                  for document in documents)
+        prompt = combine.llm_chain.prompt.invoke({combine.document_variable_name: context, "question": standalone})
+        # time_to_first_token counts from the start of the request, as the user experiences it
+        response = ThrottledStream((chunk.content for chunk in combine.llm_chain.llm.stream(prompt, self.config)),
+                                   max_updates_per_second=max_updates_per_second, min_chars=min_chars,
+                                   started_at=started_at)
+        yield from response
+
+        generation = response.finished_at - retrieved_at
+        print(AnswerTiming(condensed_at - started_at, retrieved_at - condensed_at, response.time_to_first_token,
+                           generation, response.tokens, False).summary())
+        self._remember(standalone, vector, chunk_ids, response.text, generation)
+
+    def _retrieve(self, question: str, chat_history: List[Dict[str, str]], standalone: Optional[str] = None
+                  ) -> Tuple[str, List[Document], List[str], Optional[List[float]], Optional[CachedAnswer]]:
+        """Condense (unless already done) and retrieve, then look the result up in the semantic cache."""
+        if standalone is None:
+            standalone = self.condense(question, chat_history)
+        documents = self.chain.retriever.invoke(standalone, self.config)
+        chunk_ids = [document.id for document in documents]
+
+        vector, cached = None, None
+        # Answers are only cached by store IDs; a store that doesn't return them bypasses the cache
+        if self.cache is not None and all(chunk_ids):
+            vector = self.embeddings.embed_query(standalone)
+            cached = self.cache.get(vector, chunk_ids)
+            if cached is not None:
+                print(f"Semantic cache hit for {standalone!r} (cached as {cached.question!r}); {self.cache.summary()}")
+        return standalone, documents, chunk_ids, vector, cached
+
+    def _remember(self, standalone: str, vector: Optional[List[float]], chunk_ids: List[str], answer: str,
+                  seconds: float) -> None:
+        """Add a generated answer to the semantic cache."""
+        if self.cache is not None and vector is not None:
+            self.cache.put(standalone, vector, chunk_ids, answer, seconds)
+            print(self.cache.summary())
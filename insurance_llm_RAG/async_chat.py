@@ -0,0 +1,74 @@
+"""
+Async Chat Module
+
+This module provides the pieces for serving chat answers from a single asyncio
+event loop: an AsyncOpenAI client backed by one shared, bounded HTTP connection
+pool, and a limiter that caps how many answers stream concurrently while
+queueing (up to a limit) the requests that arrive on top.
+"""
+
+import asyncio
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+
+class ServerBusyError(RuntimeError):
+    """Raised when both the concurrency limit and the waiting queue are full."""
+
+
+def make_async_client(max_connections: int = 100, timeout: float = 60.0) -> AsyncOpenAI:
+    """
+    Create an AsyncOpenAI client whose requests share one keep-alive connection pool.
+
+    Args:
+        max_connections: Maximum open HTTP connections to the API
+        timeout: Request timeout in seconds
+
+    Returns:
+        The configured client
+    """
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=timeout,
+    )
+    return AsyncOpenAI(http_client=http_client)
+
+
+class ConcurrencyLimiter:
+    """
+    An async context manager that admits at most max_concurrent holders at a time.
+
+    Up to max_waiting further callers wait their turn in FIFO order; any caller
+    beyond that is rejected immediately with ServerBusyError instead of piling up.
+    """
+
+    def __init__(self, max_concurrent: int = 32, max_waiting: Optional[int] = 256):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_concurrent: Maximum number of requests served at once
+            max_waiting: Maximum number of requests waiting for a slot, or None for no limit
+        """
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        if self._semaphore.locked() and self.max_waiting is not None and self.waiting >= self.max_waiting:
+            raise ServerBusyError(f"{self.active} requests in progress and {self.waiting} waiting")
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.active -= 1
+        self._semaphore.release()
@@ -0,0 +1,114 @@
+"""
+ANN Index Benchmark
+
+Sweeps IVFIndex build parameters (lists, PQ bytes per vector) and the n_probe
+search parameter, reporting recall@10 against exact search, p50 query latency,
+build time, index size and load time. Two corpora are measured:
+
+- the knowledge base: vectors from a saved numpy store if --store-path is given,
+  otherwise hashing embeddings of every section, queried with the section headings
+- a synthetic clustered corpus scaled up to --vectors unit vectors
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_ann_index
+    python -m benchmarks.bench_ann_index --store-path vector_db_numpy --vectors 500000 --lists 512 2048
+"""
+
+import argparse
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.bench_embeddings import load_corpus
+from benchmarks.bench_vector_store import make_corpus, percentile
+from ivf_index import IVFIndex
+from local_embeddings import HashingEmbeddings
+from numpy_store import NumpyVectorStore, normalize
+
+K = 10
+PROBES = (1, 2, 4, 8, 16, 32, 64)
+
+
+def sweep(name: str, corpus: np.ndarray, queries: np.ndarray, lists: List[int], pq_options: List[int]) -> None:
+    """Print one row per (lists, pq, n_probe) setting, preceded by the exact-search baseline."""
+    store = NumpyVectorStore()
+    store.add_vectors([Document(page_content="") for _ in range(len(corpus))], [str(i) for i in range(len(corpus))], corpus)
+
+    latencies = []
+    exact = []
+    for query in queries:
+        start = time.perf_counter()
+        exact.append(store.search_vectors(query, K, exact=True)[0][0])
+        latencies.append((time.perf_counter() - start) * 1e3)
+    latencies.sort()
+    print(f"\n{name}: {len(corpus):,} vectors x {corpus.shape[1]} dimensions, {len(queries)} queries")
+    print(f"{'lists':>6} {'pq':>4} {'build s':>8} {'MB':>7} {'load ms':>8} {'probe':>6} {'recall@10':>10} {'p50 ms':>8}")
+    print(f"{'exact':>6} {'-':>4} {'-':>8} {store.memory_bytes() / 2 ** 20:>7.1f} {'-':>8} {'-':>6} {1:>10.1%} "
+          f"{percentile(latencies, 0.5):>8.3f}")
+
+    for n_lists in lists:
+        for pq in pq_options:
+            if pq and corpus.shape[1] % pq:
+                continue
+            start = time.perf_counter()
+            store.build_ann(IVFIndex(n_lists=n_lists, pq_subvectors=pq))
+            build_seconds = time.perf_counter() - start
+            with tempfile.TemporaryDirectory() as path:
+                store.ann.save(path)
+                start = time.perf_counter()
+                IVFIndex.load(path)
+                load_ms = (time.perf_counter() - start) * 1e3
+            for n_probe in PROBES:
+                if n_probe > n_lists:
+                    break
+                store.ann.n_probe = n_probe
+                latencies = []
+                recall = 0.0
+                for query, truth in zip(queries, exact):
+                    start = time.perf_counter()
+                    rows = store.search_vectors(query, K)[0][0]
+                    latencies.append((time.perf_counter() - start) * 1e3)
+                    recall += len(set(rows) & set(truth)) / len(truth)
+                latencies.sort()
+                print(f"{n_lists:>6} {pq:>4} {build_seconds:>8.2f} {store.ann.memory_bytes() / 2 ** 20:>7.1f} "
+                      f"{load_ms:>8.2f} {n_probe:>6} {recall / len(queries):>10.1%} {percentile(latencies, 0.5):>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs. latency sweep for IVFIndex")
+    parser.add_argument("--root", default="knowledge-base")
+    parser.add_argument("--store-path", help="Saved numpy store to take the knowledge-base vectors from")
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--lists", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--pq", type=int, nargs="+", default=[0, 32])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.store_path:
+        store = NumpyVectorStore(path=args.store_path)
+        corpus = store.get(include=["embeddings"])["embeddings"]
+        rng = np.random.default_rng(args.seed)
+        queries = normalize(corpus[rng.integers(len(corpus), size=args.queries)]
+                            + 0.05 * rng.standard_normal((args.queries, corpus.shape[1])))
+    else:
+        texts, _, heading_queries = load_corpus(args.root)
+        embeddings = HashingEmbeddings()
+        corpus = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        queries = np.asarray(embeddings.embed_documents([query for query, _ in heading_queries]), dtype=np.float32)
+    small_lists = sorted({max(1, int(np.sqrt(len(corpus)))), max(1, int(np.sqrt(len(corpus))) // 4)})
+    sweep("knowledge-base", normalize(corpus), queries, small_lists, args.pq)
+
+    corpus = make_corpus(args.vectors, args.dimensions, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = normalize(corpus[rng.integers(args.vectors, size=args.queries)]
+                        + 0.1 * rng.standard_normal((args.queries, args.dimensions)))
+    sweep("synthetic", corpus, queries, args.lists, args.pq)
+
+
+if __name__ == "__main__":
+    main()
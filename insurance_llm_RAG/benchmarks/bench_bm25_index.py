@@ -0,0 +1,96 @@
+"""
+BM25 Index Benchmark
+
+Indexes a synthetic Zipf-distributed corpus with BM25Index and reports build
+time, index memory and p50/p99 query latency.
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_bm25_index
+    python -m benchmarks.bench_bm25_index --docs 10000 --trace-memory
+"""
+
+import argparse
+import itertools
+import random
+import resource
+import string
+import time
+import tracemalloc
+from typing import List
+
+from bm25_index import BM25Index
+
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    """Generate unique pseudo-words."""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))))
+    return list(words)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25Index on a synthetic corpus")
+    parser.add_argument("--docs", type=int, default=100_000, help="Number of synthetic documents")
+    parser.add_argument("--doc-length", type=int, default=80, help="Mean tokens per document")
+    parser.add_argument("--vocabulary", type=int, default=50_000, help="Distinct terms in the corpus")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--trace-memory", action="store_true", help="Also report Python heap growth during build (slower)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    print(f"Generating {args.docs:,} documents...")
+    corpus = [
+        " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=max(1, int(rng.gauss(args.doc_length, args.doc_length / 4)))))
+        for _ in range(args.docs)
+    ]
+    # Queries mix a few mid-frequency terms with one rarer, more selective term
+    queries = [
+        " ".join(rng.sample(vocabulary[100:5000], rng.randint(1, 3)) + [rng.choice(vocabulary[5000:])])
+        for _ in range(args.queries)
+    ]
+
+    if args.trace_memory:
+        tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    index = BM25Index()
+    for doc_number, text in enumerate(corpus):
+        index.add(f"doc-{doc_number}", text)
+    index.build()
+    build_seconds = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if args.trace_memory:
+        heap_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, args.k)
+        latencies.append((time.perf_counter() - start) * 1e3)
+    latencies.sort()
+
+    print(f"Documents:          {len(index):,}")
+    print(f"Vocabulary:         {len(index.vocabulary):,}")
+    print(f"Build time:         {build_seconds:.2f} s")
+    print(f"Posting arrays:     {index.memory_bytes() / 2**20:.1f} MiB")
+    print(f"Peak RSS growth:    {(rss_after - rss_before) / 1024:.1f} MiB")
+    if args.trace_memory:
+        print(f"Python heap:        {heap_bytes / 2**20:.1f} MiB")
+    print(f"Query latency p50:  {percentile(latencies, 0.50):.2f} ms")
+    print(f"Query latency p99:  {percentile(latencies, 0.99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
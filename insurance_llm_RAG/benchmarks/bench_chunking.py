@@ -0,0 +1,138 @@
+"""
+Chunking Benchmark
+
+Compares the original CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+with the markdown-aware, token-sized MarkdownChunker on the knowledge base:
+number of chunks, tokens embedded (and the share of them that is overlap),
+and dense retrieval quality over the chunks. Retrieval is scored per query as
+document recall@k, section hit@k (a returned chunk contains the first line of
+the section the query was written from) and the prompt tokens of the k chunks.
+It also times splitting a larger, replicated corpus in-process and on the
+process pool.
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_chunking
+    python -m benchmarks.bench_chunking --embeddings local --max-tokens 200 400 600 --k 3 5
+"""
+
+import argparse
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+from benchmarks.bench_hybrid_retrieval import keyword_queries
+from knowledge_base import _list_markdown, _read
+from local_embeddings import EMBEDDING_BACKENDS, make_embeddings
+from markdown_chunker import MarkdownChunker
+from markdown_sections import HEADING_PATTERN, split_sections
+from numpy_store import NumpyVectorStore
+from tokens import count_tokens
+
+# (query, source path, first body line of the section it was written from)
+Query = Tuple[str, str, str]
+
+
+def load_documents(root: str) -> List[Document]:
+    """Every markdown file as a Document, as DirectoryLoader would load it."""
+    return [Document(page_content=_read(path), metadata={"source": path, "doc_type": os.path.basename(os.path.dirname(path))})
+            for path in _list_markdown(root)]
+
+
+def make_queries(documents: List[Document]) -> Dict[str, List[Query]]:
+    """Heading and rare-keyword queries, each tied to one section of one document."""
+    heading, bodies, targets = [], [], []
+    for document in documents:
+        title = os.path.splitext(os.path.basename(document.metadata["source"]))[0]
+        for section in split_sections(document.page_content, title):
+            lines = [line.strip() for line in section.text.splitlines() if line.strip() and not HEADING_PATTERN.match(line)]
+            if not lines:
+                continue
+            subheading = section.heading.split(" > ")[-1]
+            if subheading and subheading != title:
+                heading.append((f"{subheading} {title}", document.metadata["source"], lines[0]))
+            bodies.append("\n".join(lines))
+            targets.append((document.metadata["source"], lines[0]))
+    keyword = [(query, owner, first_line) for query, (owner, first_line) in keyword_queries(bodies, targets)]
+    return {"heading": heading, "keyword": keyword}
+
+
+def character_splitter() -> Callable[[List[Document]], List[Document]]:
+    """The splitter rag_insurance_company used before MarkdownChunker, if LangChain is installed."""
+    try:
+        from langchain.text_splitter import CharacterTextSplitter
+    except ImportError:
+        return None
+    return CharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_documents
+
+
+def evaluate(chunks: List[Document], embeddings, queries: List[Query], ks: List[int]) -> List[Tuple[float, float, float]]:
+    """Return (document recall, section hit rate, mean prompt tokens) at each k."""
+    store = NumpyVectorStore(embeddings)
+    store.add_texts([chunk.page_content for chunk in chunks], [chunk.metadata for chunk in chunks])
+    results = []
+    for k in ks:
+        found, hits, tokens = 0, 0, 0
+        for query, owner, first_line in queries:
+            retrieved = store.similarity_search(query, k=k)
+            found += any(document.metadata["source"] == owner for document in retrieved)
+            hits += any(document.metadata["source"] == owner and first_line in document.page_content
+                        for document in retrieved)
+            tokens += sum(count_tokens(document.page_content) for document in retrieved)
+        results.append((found / len(queries), hits / len(queries), tokens / len(queries)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare character and markdown-aware chunking")
+    parser.add_argument("--root", default="knowledge-base")
+    parser.add_argument("--embeddings", choices=EMBEDDING_BACKENDS, default="hashing")
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=[250, 400, 600])
+    parser.add_argument("--overlap-tokens", type=int, default=40)
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 8])
+    parser.add_argument("--replicas", type=int, default=100, help="Copies of the knowledge base for the timing run")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    documents = load_documents(args.root)
+    document_tokens = sum(count_tokens(document.page_content) for document in documents)
+    queries = make_queries(documents)
+    embeddings = make_embeddings(args.embeddings)
+
+    splitters = {}
+    baseline = character_splitter()
+    if baseline is not None:
+        splitters["character 1000/200"] = baseline
+    else:
+        print("LangChain is not installed; skipping the CharacterTextSplitter baseline")
+    for max_tokens in args.max_tokens:
+        splitters[f"markdown {max_tokens}/{args.overlap_tokens}"] = MarkdownChunker(max_tokens, args.overlap_tokens).split_documents
+
+    print(f"{len(documents)} documents, {document_tokens:,} tokens, {args.embeddings} embeddings")
+    print(", ".join(f"{len(query_set)} {name} queries" for name, query_set in queries.items()) + "\n")
+    print(f"{'splitter':>20} {'chunks':>7} {'embedded':>9} {'overhead':>9} " +
+          " ".join(f"{f'recall@{k}':>9} {f'section@{k}':>10} {f'tokens@{k}':>9}" for k in args.k))
+    for name, split in splitters.items():
+        chunks = split(documents)
+        embedded = sum(count_tokens(chunk.page_content) for chunk in chunks)
+        # Overhead is overlap plus any heading labels, relative to the source text
+        prefix = f"{name:>20} {len(chunks):>7} {embedded:>9,} {embedded / document_tokens - 1:>9.1%} "
+        for set_name, query_set in queries.items():
+            row = evaluate(chunks, embeddings, query_set, args.k)
+            print(prefix + " ".join(f"{recall:>9.1%} {section:>10.1%} {tokens:>9.0f}" for recall, section, tokens in row)
+                  + f"  ({set_name})")
+            prefix = " " * len(prefix)
+
+    corpus = documents * args.replicas
+    print(f"\nSplitting {len(corpus):,} documents:")
+    for workers in (1, 0):
+        chunker = MarkdownChunker(max(args.max_tokens), args.overlap_tokens, workers=workers)
+        start = time.perf_counter()
+        count = len(chunker.split_documents(corpus))
+        print(f"  {chunker.workers:>2} process(es): {time.perf_counter() - start:.2f}s for {count:,} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Condense Skip Benchmark
+
+Runs the self-contained heuristic of question_condenser over scripted
+conversations whose follow-ups are labelled as needing the conversation or
+not, and reports how many condense LLM calls it would skip, how many of those
+skips were wrong (a dependent follow-up searched as is), and how many
+self-contained follow-ups were still sent to the LLM. The rewrite is a stub,
+so no API key is needed.
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_condense
+    python -m benchmarks.bench_condense --min-words 5
+"""
+
+import argparse
+from typing import List, Tuple
+
+from query_router import QueryRouter
+from question_condenser import QuestionCondenser, entity_matcher, is_self_contained
+
+# Conversations as (question, depends on earlier turns) pairs; the first turn never needs condensing
+CONVERSATIONS: List[List[Tuple[str, bool]]] = [
+    [("Who is Alex Chen?", False), ("What is his salary?", True), ("When did he join Insurellm?", True),
+     ("Who won IIOTY in 2023?", False), ("And in 2022?", True)],
+    [("What does Carllm do?", False), ("How much does it cost?", True), ("Which clients use Carllm?", False),
+     ("What about Homellm?", True), ("Homellm pricing tiers", False), ("Tell me more", True)],
+    [("Describe the contract with Apex Reinsurance", False), ("When does it renew?", True),
+     ("What is the SLA in the Stellar Insurance Co. contract?", False), ("Same for TechDrive Insurance?", True),
+     ("Who signed the Roadway Insurance Inc. agreement?", False)],
+    [("When was Insurellm founded?", False), ("Where are the offices?", False), ("How many employees are there?", True),
+     ("Why?", True), ("What are the company values?", False), ("Which one matters most?", True)],
+    [("Tell me about Maxine Thompson", False), ("Her performance ratings?", True), ("Emily Tran", False),
+     ("What products does Insurellm sell?", False), ("Which of those is newest?", True), ("Rellm", False)],
+    # Definite descriptions ("the contract") refer to whatever the conversation is about
+    [("Show me the Belvedere Insurance contract", False), ("When does the contract expire?", True),
+     ("What is the renewal date?", True), ("What is the price of Homellm?", False), ("Who is the manager?", True)],
+    [("What does Samantha Greene do?", False), ("What was the salary in 2022?", True),
+     ("Who reports to the CEO?", True), ("Which features does the Markellm platform have?", False),
+     ("How are the tiers priced?", True)],
+    # "That ..." points back just as "it" does
+    [("What is Rellm?", False), ("How much does that cost per month?", True), ("What does that product do?", True),
+     ("Is that still valid today?", True), ("Who signed that one?", True), ("Which clients use Homellm?", False)],
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how many condense LLM calls the heuristic skips")
+    parser.add_argument("--root", default="knowledge-base")
+    parser.add_argument("--min-words", type=int, default=4)
+    args = parser.parse_args()
+
+    router = QueryRouter.from_directory(args.root)
+    matcher = entity_matcher(name for aliases in router.names.values() for name in aliases)
+    condenser = QuestionCondenser(lambda question, transcript: question, matcher, min_words=args.min_words)
+
+    wrong_skips, missed_skips, follow_ups = [], [], 0
+    for conversation in CONVERSATIONS:
+        transcript = ""
+        for question, dependent in conversation:
+            condenser.condense(question, transcript)
+            if transcript:
+                follow_ups += 1
+                skipped = is_self_contained(question, matcher, args.min_words)
+                if skipped and dependent:
+                    wrong_skips.append(question)
+                elif not skipped and not dependent:
+                    missed_skips.append(question)
+            transcript += f"Human: {question}\nAI: ...\n"
+    print(f"{len(CONVERSATIONS)} conversations, {follow_ups} follow-ups, min_words={args.min_words}\n")
+    print(f"First pass:  {condenser.summary()}")
+
+    # Replaying the conversations (as on a retried turn) hits the rewrite cache for every condensed follow-up
+    for conversation in CONVERSATIONS:
+        transcript = ""
+        for question, _ in conversation:
+            condenser.condense(question, transcript)
+            transcript += f"Human: {question}\nAI: ...\n"
+    print(f"With replay: {condenser.summary()}")
+    print(f"Wrongly skipped (dependent follow-up searched as is): {len(wrong_skips)} {wrong_skips}")
+    print(f"Condensed although self-contained: {len(missed_skips)} {missed_skips}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Embeddings Benchmark
+
+Compares embedding backends on the real knowledge base: throughput (texts/sec)
+embedding every section of every document, query latency, and document-level
+recall@k for queries built from the section headings ("Compensation History
+Alex Chen" should retrieve a section of Alex Chen's file). Heading lines are
+stripped from the indexed text so a query cannot match by copying them.
+
+The hashing backend always runs, the local backend runs when
+sentence-transformers is installed, and the hosted OpenAI backend only runs
+with --openai because it spends API credits.
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_embeddings
+    python -m benchmarks.bench_embeddings --openai --k 1 3 5
+"""
+
+import argparse
+import os
+import time
+from typing import List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from knowledge_base import _list_markdown, _read
+from local_embeddings import make_embeddings
+from markdown_sections import HEADING_PATTERN, split_sections
+
+
+def load_corpus(root: str) -> Tuple[List[str], List[str], List[Tuple[str, str]]]:
+    """Return section texts, the document each belongs to, and (query, document) pairs."""
+    texts, owners, queries = [], [], []
+    for path in _list_markdown(root):
+        title = os.path.basename(path)[:-3]
+        for section in split_sections(_read(path), title):
+            body = "\n".join(line for line in section.text.splitlines() if not HEADING_PATTERN.match(line)).strip()
+            if not body:
+                continue
+            texts.append(body)
+            owners.append(path)
+            subheading = section.heading.split(" > ")[-1]
+            if subheading and subheading != title:
+                queries.append((f"{subheading} {title}", path))
+    return texts, owners, queries
+
+
+def run(backend: str, texts: List[str], owners: List[str], queries: List[Tuple[str, str]], ks: List[int]) -> str:
+    """Embed the corpus and queries with one backend and return a results row."""
+    embeddings = make_embeddings(backend)
+    start = time.perf_counter()
+    matrix = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    embed_seconds = time.perf_counter() - start
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    latencies = []
+    found = {k: 0 for k in ks}
+    for query, owner in queries:
+        start = time.perf_counter()
+        vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+        latencies.append((time.perf_counter() - start) * 1e3)
+        ranked = np.argsort(-(matrix @ vector))[:max(ks)]
+        for k in ks:
+            found[k] += any(owners[i] == owner for i in ranked[:k])
+
+    recalls = " ".join(f"{found[k] / len(queries):>9.1%}" for k in ks)
+    return (f"{backend:>8} {matrix.shape[1]:>6} {len(texts) / embed_seconds:>10.0f} "
+            f"{float(np.median(latencies)):>10.2f} {recalls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends on the knowledge base")
+    parser.add_argument("--root", default="knowledge-base")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--openai", action="store_true", help="Also benchmark the hosted OpenAI embeddings")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    texts, owners, queries = load_corpus(args.root)
+    print(f"{len(texts)} sections, {len(queries)} heading queries\n")
+
+    backends = ["hashing"]
+    try:
+        import sentence_transformers  # noqa: F401
+        backends.append("local")
+    except ImportError:
+        print("sentence-transformers is not installed; skipping the local backend")
+    if args.openai:
+        backends.append("openai")
+
+    recall_headers = " ".join(f"{f'recall@{k}':>9}" for k in args.k)
+    print(f"{'backend':>8} {'dims':>6} {'texts/s':>10} {'query ms':>10} {recall_headers}")
+    for backend in backends:
+        print(run(backend, texts, owners, queries, args.k))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Entity Index Benchmark
+
+Builds an EntityIndex over a synthetic employee directory (full names, first
+names and surnames) and reports lookup latency and how often a misspelled
+surname still finds the right person.
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_entity_index
+    python -m benchmarks.bench_entity_index --people 1000 10000 50000
+"""
+
+import argparse
+import random
+import string
+import time
+from typing import List
+
+from entity_index import EntityIndex
+
+
+def make_name(rng: random.Random) -> str:
+    """Generate a pronounceable-ish capitalized name."""
+    consonants, vowels = "bcdfghjklmnprstvwz", "aeiou"
+    length = rng.randint(2, 4)
+    return "".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)).title()
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """Apply one random insertion, deletion or substitution."""
+    position = rng.randrange(len(word))
+    edit = rng.choice(("insert", "delete", "substitute"))
+    letter = rng.choice(string.ascii_lowercase)
+    if edit == "insert":
+        return word[:position] + letter + word[position:]
+    if edit == "delete":
+        return word[:position] + word[position + 1:]
+    return word[:position] + letter + word[position + 1:]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy name lookup against directory size")
+    parser.add_argument("--people", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'people':>8} {'aliases':>9} {'build ms':>9} {'p50 us':>8} {'p99 us':>8} {'typo recall':>12}")
+    for people in args.people:
+        employees = [(make_name(rng), make_name(rng)) for _ in range(people)]
+        start = time.perf_counter()
+        index = EntityIndex()
+        for number, (first, last) in enumerate(employees):
+            for alias in (f"{first} {last}", first, last):
+                index.add(alias, number)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        latencies = []
+        found = 0
+        for _ in range(args.queries):
+            number = rng.randrange(people)
+            query = misspell(employees[number][1].lower(), rng)
+            start = time.perf_counter()
+            results = index.lookup(query, limit=10)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            found += any(entity == number for entity, _, _ in results)
+        latencies.sort()
+        print(f"{people:>8,} {len(index):>9,} {build_ms:>9.1f} {percentile(latencies, 0.5):>8.1f} "
+              f"{percentile(latencies, 0.99):>8.1f} {found / args.queries:>11.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Hybrid Retrieval Benchmark
+
+Indexes every section of the knowledge base and compares dense, BM25, hybrid
+(RRF) and routed doc_type-partitioned hybrid retrieval by document-level
+recall@k, precision@k (share of returned chunks from the right document) and
+the prompt tokens the retrieved chunks would cost. Two query sets are used:
+
+- heading queries ("Compensation History Alex Chen"), which favour paraphrase matching
+- keyword queries built from the two rarest words of a section (names, codes, figures),
+  which favour exact matching
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_hybrid_retrieval
+    python -m benchmarks.bench_hybrid_retrieval --embeddings local --k 3 5 8 25
+"""
+
+import argparse
+import os
+from typing import Callable, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from benchmarks.bench_embeddings import load_corpus
+from bm25_index import tokenize
+from hybrid_retriever import HybridIndex
+from local_embeddings import EMBEDDING_BACKENDS, make_embeddings
+from numpy_store import NumpyVectorStore
+from partitioned_retriever import PartitionedIndex
+from query_router import QueryRouter
+from tokens import count_tokens
+
+
+def keyword_queries(texts: List[str], owners: List[str]) -> List[Tuple[str, str]]:
+    """One query per section made of its two highest-IDF tokens."""
+    document_frequency: Dict[str, int] = {}
+    for text in texts:
+        for token in set(tokenize(text)):
+            document_frequency[token] = document_frequency.get(token, 0) + 1
+    queries = []
+    for text, owner in zip(texts, owners):
+        tokens = sorted(set(tokenize(text)), key=lambda token: (document_frequency[token], token))
+        rare = [token for token in tokens if not token.isdigit()][:2]
+        if len(rare) == 2:
+            queries.append((f"What about {rare[0]} and {rare[1]}?", owner))
+    return queries
+
+
+def evaluate(search: Callable[[str, int], List[str]], queries: List[Tuple[str, str]], owners: Dict[str, str],
+             texts: Dict[str, str], ks: List[int]) -> List[Tuple[float, float, float]]:
+    """Return (document recall, precision, mean prompt tokens) at each k."""
+    results = []
+    for k in ks:
+        found, relevant, returned, tokens = 0, 0, 0, 0
+        for query, owner in queries:
+            ids = search(query, k)
+            hits = sum(owners[doc_id] == owner for doc_id in ids)
+            found += hits > 0
+            relevant += hits
+            returned += len(ids)
+            tokens += sum(count_tokens(texts[doc_id]) for doc_id in ids)
+        results.append((found / len(queries), relevant / max(returned, 1), tokens / len(queries)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dense, BM25 and hybrid retrieval on the knowledge base")
+    parser.add_argument("--root", default="knowledge-base")
+    parser.add_argument("--embeddings", choices=EMBEDDING_BACKENDS, default="hashing")
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 8, 25])
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    section_texts, section_owners, heading_queries = load_corpus(args.root)
+    ids = [str(number) for number in range(len(section_texts))]
+    owners = dict(zip(ids, section_owners))
+    texts = dict(zip(ids, section_texts))
+
+    store = NumpyVectorStore(make_embeddings(args.embeddings))
+    metadatas = [{"source": owner, "doc_type": os.path.basename(os.path.dirname(owner))} for owner in section_owners]
+    store.add_texts(section_texts, metadatas, ids)
+    index = HybridIndex(store, candidates=max(args.k))
+    partitioned = PartitionedIndex(store, store.embeddings, QueryRouter.from_directory(args.root), candidates=max(args.k))
+
+    methods = {
+        "dense": lambda query, k: index.dense_ids(query)[:k],
+        "bm25": lambda query, k: index.keyword_ids(query)[:k],
+        "hybrid": lambda query, k: [doc_id for doc_id, _ in index.rank(query)[:k]],
+        "routed": lambda query, k: [document.id for document in partitioned.search(query, k)],
+    }
+    query_sets = {"heading": heading_queries, "keyword": keyword_queries(section_texts, section_owners)}
+
+    print(f"{len(ids)} sections, {args.embeddings} embeddings\n")
+    print(f"{'queries':>8} {'method':>7} " + " ".join(f"{f'recall@{k}':>10} {f'prec@{k}':>8} {f'tokens@{k}':>10}"
+                                                     for k in args.k))
+    for set_name, queries in query_sets.items():
+        for name, search in methods.items():
+            row = evaluate(search, queries, owners, texts, args.k)
+            print(f"{set_name:>8} {name:>7} " + " ".join(f"{recall:>10.1%} {precision:>8.1%} {tokens:>10.0f}"
+                                                         for recall, precision, tokens in row))
+    print(f"\n{partitioned.summary()}")
+
+
+if __name__ == "__main__":
+    main()
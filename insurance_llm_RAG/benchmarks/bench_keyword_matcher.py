@@ -0,0 +1,77 @@
+"""
+Keyword Matcher Benchmark
+
+Compares the original per-title substring scan used by diy_rag_system with the
+precompiled KeywordMatcher as the number of knowledge-base titles grows.
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_keyword_matcher
+    python -m benchmarks.bench_keyword_matcher --sizes 100 1000 10000 --queries 500
+"""
+
+import argparse
+import random
+import string
+import time
+from typing import List
+
+from keyword_matcher import KeywordMatcher
+
+
+def make_keywords(count: int, rng: random.Random) -> List[str]:
+    """Generate unique, title-cased pseudo surnames and product names."""
+    keywords = set()
+    while len(keywords) < count:
+        length = rng.randint(4, 10)
+        keywords.add("".join(rng.choice(string.ascii_lowercase) for _ in range(length)).title())
+    return sorted(keywords)
+
+
+def make_messages(keywords: List[str], count: int, rng: random.Random) -> List[str]:
+    """Generate chat messages that mention zero to three of the keywords."""
+    filler = "who is the lead on the contract and what did they ship last year".split()
+    messages = []
+    for _ in range(count):
+        words = rng.sample(filler, 8) + rng.sample(keywords, min(len(keywords), rng.randint(0, 3)))
+        rng.shuffle(words)
+        messages.append(" ".join(words) + "?")
+    return messages
+
+
+def naive_find_all(keywords: List[str], message: str) -> List[str]:
+    """The original brute-force scan from get_relevant_context."""
+    return [keyword for keyword in keywords if keyword.lower() in message.lower()]
+
+
+def time_per_query(func, messages: List[str]) -> float:
+    """Return the mean latency of func over messages in microseconds."""
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyword lookup against knowledge-base size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200, help="Messages to time per size")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'keywords':>10} {'build ms':>10} {'naive us/q':>12} {'matcher us/q':>14} {'speedup':>9}")
+    for size in args.sizes:
+        keywords = make_keywords(size, rng)
+        messages = make_messages(keywords, args.queries, rng)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        naive_us = time_per_query(lambda m: naive_find_all(keywords, m), messages)
+        matcher_us = time_per_query(matcher.find_all, messages)
+        print(f"{size:>10,} {build_ms:>10.1f} {naive_us:>12.1f} {matcher_us:>14.1f} {naive_us / matcher_us:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
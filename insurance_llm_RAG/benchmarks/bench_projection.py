@@ -0,0 +1,105 @@
+"""
+Embedding Projection Benchmark
+
+Measures the visualization pipeline of embedding_projection: streamed PCA fit,
+approximate neighbour graph, 2D layout, and the incremental update after 1% of
+the chunks change, and scores each layout by how many of a point's 10 nearest
+neighbours (by cosine, in the full embedding space) stay among its 10 nearest
+in the plot. scikit-learn's t-SNE, which the visualize command used before, is
+included on corpora of up to --tsne-limit points when it is installed.
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_projection
+    python -m benchmarks.bench_projection --sizes 10000 100000 --dimensions 1536
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.bench_embeddings import load_corpus
+from benchmarks.bench_vector_store import make_corpus
+from embedding_projection import Projection
+from local_embeddings import make_embeddings
+from numpy_store import NumpyVectorStore
+
+
+def neighbourhood_kept(vectors: np.ndarray, coords: np.ndarray, k: int = 10, samples: int = 500,
+                       seed: int = 0) -> float:
+    """Average share of a sampled point's k nearest neighbours (cosine) that are also nearest in coords."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), min(samples, len(vectors)), replace=False)
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = unit[rows] @ unit.T
+    similarity[np.arange(len(rows)), rows] = -np.inf
+    distance = ((coords[rows, None, :] - coords[None, :, :]) ** 2).sum(axis=2)
+    distance[np.arange(len(rows)), rows] = np.inf
+    true = np.argpartition(-similarity, k, axis=1)[:, :k]
+    shown = np.argpartition(distance, k, axis=1)[:, :k]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(true, shown)]))
+
+
+def timed(function: Callable):
+    """Call function and return (its result, seconds taken)."""
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def run(name: str, vectors: np.ndarray, tsne_limit: int) -> None:
+    """Fit, lay out and incrementally update a projection of vectors, printing timings and quality."""
+    ids = [str(number) for number in range(len(vectors))]
+    store = NumpyVectorStore()
+    store.add_vectors([Document(page_content="") for _ in ids], ids, vectors)
+
+    projection, fit_seconds = timed(lambda: Projection.fit(store))
+    print(f"{name}: {len(vectors):,} x {vectors.shape[1]}, PCA fit {fit_seconds:.2f}s")
+    layouts = {}
+    for layout in ("pca", "graph"):
+        layouts[layout], seconds = timed(lambda: projection.coordinates(layout, 2))
+        print(f"  {layout:>5} 2D layout {seconds:7.2f}s, 10-NN kept {neighbourhood_kept(vectors, layouts[layout]):.1%}")
+
+    # Replace 1% of the chunks and update incrementally
+    changed = max(1, len(vectors) // 100)
+    rng = np.random.default_rng(1)
+    store.delete(ids[:changed])
+    new_ids = [f"new-{number}" for number in range(changed)]
+    new_vectors = vectors[rng.choice(len(vectors), changed)] + rng.normal(0, 0.01, (changed, vectors.shape[1]))
+    store.add_vectors([Document(page_content="") for _ in new_ids], new_ids, new_vectors.astype(np.float32))
+    _, seconds = timed(lambda: projection.update(store, store.get(include=[])["ids"]))
+    print(f"  incremental update of {changed:,} chunks {seconds:.2f}s (a refit took {fit_seconds:.2f}s + layout)")
+
+    if len(vectors) <= tsne_limit:
+        try:
+            from sklearn.manifold import TSNE
+        except ImportError:
+            return
+        coords, seconds = timed(lambda: TSNE(n_components=2, random_state=42).fit_transform(vectors))
+        print(f"  t-SNE 2D layout {seconds:7.2f}s, 10-NN kept {neighbourhood_kept(vectors, coords):.1%}")
+
+
+def knowledge_base_vectors(root: str) -> np.ndarray:
+    """Hashing embeddings of every knowledge-base section."""
+    texts, _, _ = load_corpus(root)
+    return np.asarray(make_embeddings("hashing").embed_documents(texts), dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cached embedding projection used by visualize")
+    parser.add_argument("--root", default="knowledge-base")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--tsne-limit", type=int, default=10_000)
+    args = parser.parse_args()
+
+    vectors = knowledge_base_vectors(args.root)
+    run("knowledge base (hashing embeddings)", vectors, args.tsne_limit)
+    for size in args.sizes:
+        run("synthetic", make_corpus(size, args.dimensions, seed=0), args.tsne_limit)
+
+
+if __name__ == "__main__":
+    main()
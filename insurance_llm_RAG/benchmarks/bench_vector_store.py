@@ -0,0 +1,126 @@
+"""
+Vector Store Benchmark
+
+Compares NumpyVectorStore (float32, float16 and int8 storage) with Chroma on a
+synthetic corpus of unit vectors: single-query p50/p99 latency, batched
+multi-query throughput, recall@10 against exact float32 search, and the
+resident memory a freshly started process gains by opening the store and
+serving the queries. Each store is opened in its own process so the memory
+numbers don't overlap. Chroma is skipped if chromadb is not installed.
+
+Usage (from the insurance_llm_RAG directory):
+    python -m benchmarks.bench_vector_store
+    python -m benchmarks.bench_vector_store --vectors 10000 100000 --dimensions 1536
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from numpy_store import STORAGE_DTYPES, NumpyVectorStore, normalize
+
+K = 10
+BATCH_SIZE = 32
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def make_corpus(count: int, dimensions: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors, so nearest neighbours are meaningful."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 100), dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.5 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return normalize(vectors)
+
+
+def measure(kind: str, path: str, queries: np.ndarray) -> Tuple[np.ndarray, List[float], float, int]:
+    """Open a saved store, run the queries, and return (top-k rows, latencies ms, batch qps, RSS delta)."""
+    baseline = rss_bytes()
+    if kind == "chroma":
+        import chromadb
+        collection = chromadb.PersistentClient(path=path).get_collection("bench")
+        search = lambda batch: [[int(i) for i in ids] for ids in collection.query(query_embeddings=batch.tolist(), n_results=K, include=[])["ids"]]
+    else:
+        store = NumpyVectorStore(path=path)
+        search = lambda batch: store.search_vectors(batch, K)[0].tolist()
+
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        found.extend(search(query[None, :]))
+        latencies.append((time.perf_counter() - start) * 1e3)
+    start = time.perf_counter()
+    for offset in range(0, len(queries), BATCH_SIZE):
+        search(queries[offset:offset + BATCH_SIZE])
+    batch_qps = len(queries) / (time.perf_counter() - start)
+    return np.array(found), sorted(latencies), batch_qps, rss_bytes() - baseline
+
+
+def build_chroma(path: str, corpus: np.ndarray) -> None:
+    import chromadb
+    collection = chromadb.PersistentClient(path=path).create_collection("bench", metadata={"hnsw:space": "cosine"})
+    for start in range(0, len(corpus), 5000):
+        batch = corpus[start:start + 5000]
+        collection.add(ids=[str(i) for i in range(start, start + len(batch))], embeddings=batch.tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NumpyVectorStore against Chroma")
+    parser.add_argument("--vectors", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        import chromadb  # noqa: F401
+        kinds = list(STORAGE_DTYPES) + ["chroma"]
+    except ImportError:
+        print("chromadb is not installed; skipping Chroma\n")
+        kinds = list(STORAGE_DTYPES)
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'vectors':>8} {'store':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch q/s':>10} {'recall@10':>10} {'RSS MB':>8}")
+    for count in args.vectors:
+        corpus = make_corpus(count, args.dimensions, args.seed)
+        queries = normalize(corpus[np.random.default_rng(args.seed + 1).integers(count, size=args.queries)]
+                            + 0.1 * np.random.default_rng(args.seed + 2).standard_normal((args.queries, args.dimensions)))
+        exact = np.argsort(-(queries @ corpus.T), axis=1)[:, :K]
+
+        with tempfile.TemporaryDirectory() as root:
+            for kind in kinds:
+                path = os.path.join(root, kind)
+                if kind == "chroma":
+                    build_chroma(path, corpus)
+                else:
+                    store = NumpyVectorStore(path=path, dtype=kind)
+                    store.add_vectors([Document(page_content="") for _ in range(count)], [str(i) for i in range(count)], corpus)
+                    store.save()
+                with context.Pool(1) as pool:
+                    found, latencies, batch_qps, rss = pool.apply(measure, (kind, path, queries))
+                recall = np.mean([len(set(row) & set(truth)) / K for row, truth in zip(found, exact)])
+                print(f"{count:>8,} {kind:>8} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.99):>8.2f} "
+                      f"{batch_qps:>10.0f} {recall:>10.1%} {rss / 2 ** 20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+BM25 Index Module
+
+This module provides an in-process BM25 inverted index. Postings are kept in
+flat typed arrays (CSR layout: one offsets array pointing into shared doc-id and
+term-frequency arrays) so that large corpora stay compact in memory.
+"""
+
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Very common English words carry no ranking signal but have the longest posting lists
+STOPWORDS = frozenset("""
+a an and are as at be by can did do does for from had has have he her his how i if in into is it its
+me my of on or our she so than that the their them there these they this to was we were what when
+where which who whom why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase alphanumeric tokens, dropping stopwords.
+
+    Args:
+        text: The text to tokenize
+
+    Returns:
+        The list of tokens in document order
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    An Okapi BM25 inverted index with array-backed postings.
+
+    Documents are added with add() and become searchable after build(). A built
+    index is read-only; build a new one to change the corpus.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: Term-frequency saturation parameter
+            b: Document-length normalization parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+
+        # Per-term posting arrays, used only while documents are being added
+        self._pending_docs: List[array] = []
+        self._pending_tfs: List[array] = []
+        self._doc_lengths = array("I")
+
+        # Compacted postings, populated by build()
+        self._offsets = array("Q", [0])
+        self._postings_docs = array("I")
+        self._postings_tfs = array("H")
+        self._idf = array("f")
+        self._length_norms = array("f")
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """
+        Tokenize and add a document to the index.
+
+        Args:
+            doc_id: Identifier returned by search()
+            text: The document text
+        """
+        self.add_tokens(doc_id, tokenize(text))
+
+    def add_tokens(self, doc_id: str, tokens: List[str]) -> None:
+        """
+        Add an already tokenized document to the index.
+
+        Args:
+            doc_id: Identifier returned by search()
+            tokens: The document tokens, as produced by tokenize()
+
+        Raises:
+            RuntimeError: If the index has already been built
+        """
+        if self._built:
+            raise RuntimeError("Cannot add documents to a built BM25Index")
+        doc_number = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self._doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                term_id = self.vocabulary[term] = len(self._pending_docs)
+                self._pending_docs.append(array("I"))
+                self._pending_tfs.append(array("H"))
+            self._pending_docs[term_id].append(doc_number)
+            self._pending_tfs[term_id].append(min(tf, 0xFFFF))
+
+    def build(self) -> "BM25Index":
+        """
+        Compact the pending postings and precompute IDF and length norms.
+
+        Returns:
+            The index itself, so construction can be chained
+        """
+        doc_count = len(self.doc_ids)
+        offsets = array("Q", [0])
+        postings_docs = array("I")
+        postings_tfs = array("H")
+        idf = array("f")
+        for docs, tfs in zip(self._pending_docs, self._pending_tfs):
+            postings_docs.extend(docs)
+            postings_tfs.extend(tfs)
+            offsets.append(len(postings_docs))
+            df = len(docs)
+            idf.append(_idf(doc_count, df))
+
+        average_length = (sum(self._doc_lengths) / doc_count) if doc_count else 0.0
+        length_norms = array("f", (
+            self.k1 * (1 - self.b + self.b * length / average_length) if average_length else self.k1
+            for length in self._doc_lengths
+        ))
+
+        self._offsets, self._postings_docs, self._postings_tfs = offsets, postings_docs, postings_tfs
+        self._idf, self._length_norms = idf, length_norms
+        self._pending_docs, self._pending_tfs = [], []
+        self._built = True
+        return self
+
+    def search(self, query: str, k: int = 5, doc_filter: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank documents against a query.
+
+        Args:
+            query: Free-text query
+            k: Maximum number of results
+            doc_filter: Optional predicate on doc_id; only matching documents are returned
+
+        Returns:
+            Up to k (doc_id, score) pairs, best first
+
+        Raises:
+            RuntimeError: If build() has not been called
+        """
+        if not self._built:
+            raise RuntimeError("Call build() before searching a BM25Index")
+        scores: Dict[int, float] = {}
+        k1_plus_one = self.k1 + 1
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            idf = self._idf[term_id]
+            docs = self._postings_docs[start:end]
+            tfs = self._postings_tfs[start:end]
+            norms = self._length_norms
+            for doc, tf in zip(docs, tfs):
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * k1_plus_one / (tf + norms[doc])
+
+        if doc_filter is not None:
+            doc_ids = self.doc_ids
+            scores = {doc: score for doc, score in scores.items() if doc_filter(doc_ids[doc])}
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[doc], score) for doc, score in best]
+
+    def memory_bytes(self) -> int:
+        """Return the size of the compacted posting and statistics arrays in bytes."""
+        arrays = (self._offsets, self._postings_docs, self._postings_tfs, self._idf, self._length_norms, self._doc_lengths)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+def _idf(doc_count: int, df: int) -> float:
+    """BM25 inverse document frequency (the non-negative Lucene variant)."""
+    return math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
@@ -0,0 +1,84 @@
+"""
+Context Packer Module
+
+This module selects and trims retrieved passages so that the context injected
+into a prompt stays within a fixed token budget, preferring the passages with
+the highest relevance scores.
+"""
+
+from typing import Iterable, List, NamedTuple, Tuple
+
+from tokens import DEFAULT_MODEL, count_tokens, truncate_to_tokens
+
+
+class PackedContext(NamedTuple):
+    """The outcome of packing candidates into a token budget."""
+    passages: List[str]
+    tokens_used: int
+    tokens_available: int
+
+    @property
+    def tokens_saved(self) -> int:
+        """Tokens that were left out compared to sending every candidate in full."""
+        return self.tokens_available - self.tokens_used
+
+
+class ContextPacker:
+    """
+    Greedily packs the most relevant passages into a token budget, trimming at
+    paragraph boundaries when a passage does not fit whole.
+    """
+
+    def __init__(self, token_budget: int = 1500, min_passage_tokens: int = 64, model: str = DEFAULT_MODEL):
+        """
+        Initialize the packer.
+
+        Args:
+            token_budget: Maximum number of context tokens to emit
+            min_passage_tokens: Don't emit trimmed passages shorter than this
+            model: Model whose tokenizer should be used for counting
+        """
+        self.token_budget = token_budget
+        self.min_passage_tokens = min_passage_tokens
+        self.model = model
+
+    def pack(self, candidates: Iterable[Tuple[str, float]]) -> PackedContext:
+        """
+        Choose and trim passages to fit the budget.
+
+        Args:
+            candidates: (passage, relevance score) pairs; higher scores are preferred
+
+        Returns:
+            The selected passages in order of relevance and the token accounting
+        """
+        ranked = sorted(candidates, key=lambda candidate: candidate[1], reverse=True)
+        passages = []
+        tokens_used = 0
+        tokens_available = 0
+        for passage, _ in ranked:
+            tokens = count_tokens(passage, self.model)
+            tokens_available += tokens
+            remaining = self.token_budget - tokens_used
+            if tokens <= remaining:
+                passages.append(passage)
+                tokens_used += tokens
+            elif remaining >= self.min_passage_tokens:
+                trimmed = self._trim(passage, remaining)
+                passages.append(trimmed)
+                tokens_used += count_tokens(trimmed, self.model)
+        return PackedContext(passages, tokens_used, tokens_available)
+
+    def _trim(self, passage: str, max_tokens: int) -> str:
+        """Keep as many leading paragraphs as fit, cutting mid-paragraph only if the first is too long."""
+        kept = []
+        used = 0
+        for paragraph in passage.split("\n\n"):
+            tokens = count_tokens(paragraph + "\n\n", self.model)
+            if used + tokens > max_tokens:
+                break
+            kept.append(paragraph)
+            used += tokens
+        if kept:
+            return "\n\n".join(kept)
+        return truncate_to_tokens(passage, max_tokens, self.model)
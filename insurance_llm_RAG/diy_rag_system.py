@@ -14,80 +14,192 @@
 
 # imports
 import os
-import glob
+import json
+import time
+import argparse
 from dotenv import load_dotenv
 import gradio as gr
 from openai import OpenAI
+from knowledge_base import KnowledgeBaseWatcher
+from context_packer import ContextPacker
+from response_cache import ResponseCache, stream_cached
+from streaming import ThrottledStream
+from history_manager import HistoryManager
+from async_chat import ConcurrencyLimiter, ServerBusyError, make_async_client
+
+# Load environment variables in a file called .env (before reading any settings below)
+load_dotenv(override=True)
+os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY', 'your-key-if-not-using-env')
 
 # price is a factor for our company, so we're going to use a low cost model
 MODEL = "gpt-4o-mini"
 
-# Load environment variables in a file called .env
-load_dotenv(override=True)
-os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY', 'your-key-if-not-using-env')
-openai = OpenAI()
+# Number of BM25 sections to add on top of the best sections of any documents named in the question
+RETRIEVAL_K = 3
+SECTIONS_PER_TITLE = 2
+
+# Seconds between checks of knowledge-base/ for edited, added or deleted files
+RELOAD_INTERVAL = 2.0
+
+# Maximum number of tokens of retrieved context to add to a question
+CONTEXT_TOKEN_BUDGET = 1500
+
+# Maximum tokens of earlier conversation to send with each question. Older turns are dropped,
+# or summarized with an extra (cheap) LLM call when SUMMARIZE_HISTORY is enabled
+HISTORY_TOKEN_BUDGET = 2000
+SUMMARIZE_HISTORY = False
+
+# Answers are reused for identical questions asked with identical context; set a path to keep them across restarts
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")
+
+# Limit how often the growing answer is pushed to the UI: at most this many updates per second,
+# each carrying at least this many new characters
+STREAM_UPDATES_PER_SECOND = 15
+STREAM_MIN_CHARS = 1
+
+# Async mode (--async-chat): answers streaming at once, answers allowed to wait for a slot,
+# and HTTP connections shared by all of them
+MAX_CONCURRENT_ANSWERS = int(os.getenv("MAX_CONCURRENT_ANSWERS", "64"))
+MAX_WAITING_ANSWERS = int(os.getenv("MAX_WAITING_ANSWERS", "256"))
+MAX_CONNECTIONS = MAX_CONCURRENT_ANSWERS
 
-# Build the context dictionary by loading employee and product information
-# With massive thanks to student Dr John S. for fixing a bug in the below for Windows users!
-context = {}
-
-# Load employee information
-employees = glob.glob("knowledge-base/employees/*")
-for employee in employees:
-    name = employee.split(' ')[-1][:-3]
-    doc = ""
-    with open(employee, "r", encoding="utf-8") as f:
-        doc = f.read()
-    context[name] = doc
-
-# Load product information
-products = glob.glob("knowledge-base/products/*")
-for product in products:
-    name = product.split(os.sep)[-1][:-3]
-    doc = ""
-    with open(product, "r", encoding="utf-8") as f:
-        doc = f.read()
-    context[name] = doc
+openai = OpenAI()
+async_openai = make_async_client(max_connections=MAX_CONNECTIONS)
+limiter = ConcurrencyLimiter(max_concurrent=MAX_CONCURRENT_ANSWERS, max_waiting=MAX_WAITING_ANSWERS)
+
+# Load every markdown file, split into heading-delimited sections, and index the sections
+# With massive thanks to student Dr John S. for fixing a bug in the original loader for Windows users!
+# The watcher re-indexes changed files in the background, so edits don't need a server restart
+watcher = KnowledgeBaseWatcher("knowledge-base", interval=RELOAD_INTERVAL).start()
+packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET, model=MODEL)
+history_manager = HistoryManager(
+    token_budget=HISTORY_TOKEN_BUDGET,
+    summarizer=(lambda messages: summarize_history(messages)) if SUMMARIZE_HISTORY else None,
+    model=MODEL,
+)
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, path=RESPONSE_CACHE_PATH)
 
 # Define the system message for the LLM
 system_message = "You are an expert in answering accurate questions about Insurellm, the Insurance Tech company. Give brief, accurate answers. If you don't know the answer, say so. Do not make anything up if you haven't been provided with relevant context."
 
 
+def search(query, k=RETRIEVAL_K):
+    """Return (section, score) pairs for the sections that best match the query."""
+    return watcher.current.search(query, k, sections_per_title=SECTIONS_PER_TITLE)
+
+
 def get_relevant_context(message):
-    """Retrieve relevant context based on keywords in the message."""
-    relevant_context = []
-    for context_title, context_details in context.items():
-        if context_title.lower() in message.lower():
-            relevant_context.append(context_details)
-    return relevant_context
+    """Retrieve (passage, score) pairs for the sections relevant to the message, labelled with their document."""
+    return [(section.render(), score) for section, score in search(message)]
+
+
+def summarize_history(messages):
+    """Condense earlier conversation turns into a few sentences for the history manager."""
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    response = openai.chat.completions.create(model=MODEL, messages=[
+        {"role": "system", "content": "Summarize this conversation in at most five sentences, keeping names, numbers and facts."},
+        {"role": "user", "content": transcript},
+    ])
+    return response.choices[0].message.content
 
 
 def add_context(message):
-    """Add relevant context to the message before sending to the LLM."""
-    relevant_context = get_relevant_context(message)
-    if relevant_context:
+    """Add relevant context to the message, within the context token budget."""
+    packed = packer.pack(get_relevant_context(message))
+    if packed.passages:
+        print(f"Context: {packed.tokens_used} tokens packed, {packed.tokens_saved} saved")
         message += "\n\nThe following additional context might be relevant in answering this question:\n\n"
-        for relevant in relevant_context:
+        for relevant in packed.passages:
             message += relevant + "\n\n"
     return message
 
 
+def prepare_messages(message, history):
+    """Build the messages to send for a question and the response cache key that identifies them."""
+    compacted = history_manager.compact(history)
+    messages = [{"role": "system", "content": system_message}] + compacted.messages
+    prompt = add_context(message)
+    messages.append({"role": "user", "content": prompt})
+    print(f"Prompt: {history_manager.count(messages)} tokens "
+          f"({compacted.tokens} of history, {compacted.dropped} earlier messages left out)")
+
+    # The answer depends on the history and the injected context as well as the question itself
+    conversation = json.dumps([[turn["role"], turn["content"]] for turn in compacted.messages], default=str)
+    cache_key = response_cache.key(message, conversation + prompt[len(message):], MODEL)
+    return messages, cache_key
+
+
+def cached_response(cache_key):
+    """Return the cached answer for a key, if any, logging the hit."""
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        print(f"Response cache hit ({response_cache.hits} hits, {response_cache.misses} misses)")
+    return cached
+
+
 def chat(message, history):
     """Chat function that uses RAG to retrieve context and answer questions."""
-    messages = [{"role": "system", "content": system_message}] + history
-    message = add_context(message)
-    messages.append({"role": "user", "content": message})
+    messages, cache_key = prepare_messages(message, history)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        yield from stream_cached(cached)
+        return
 
+    started_at = time.perf_counter()
     stream = openai.chat.completions.create(model=MODEL, messages=messages, stream=True)
 
-    response = ""
-    for chunk in stream:
-        response += chunk.choices[0].delta.content or ''
-        yield response
+    response = ThrottledStream(
+        (chunk.choices[0].delta.content for chunk in stream),
+        max_updates_per_second=STREAM_UPDATES_PER_SECOND,
+        min_chars=STREAM_MIN_CHARS,
+        started_at=started_at,
+    )
+    yield from response
+    print(f"Streamed {response.summary()}")
+    response_cache.put(cache_key, response.text)
+
+
+async def async_chat(message, history):
+    """Async version of chat() that streams through the shared async client, within the concurrency limit."""
+    messages, cache_key = prepare_messages(message, history)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        for partial in stream_cached(cached):
+            yield partial
+        return
+
+    try:
+        async with limiter:
+            started_at = time.perf_counter()
+            stream = await async_openai.chat.completions.create(model=MODEL, messages=messages, stream=True)
+
+            response = ThrottledStream(
+                (chunk.choices[0].delta.content async for chunk in stream),
+                max_updates_per_second=STREAM_UPDATES_PER_SECOND,
+                min_chars=STREAM_MIN_CHARS,
+                started_at=started_at,
+            )
+            async for partial in response:
+                yield partial
+    except ServerBusyError as e:
+        print(f"Rejected question, server busy: {e}")
+        yield "Sorry, the assistant is busy right now. Please try again in a moment."
+        return
+    print(f"Streamed {response.summary()}")
+    response_cache.put(cache_key, response.text)
 
 
 # Launch the Gradio Chat Interface
 # A quick and easy way to prototype a chat with an LLM
 if __name__ == "__main__":
-    view = gr.ChatInterface(chat, type="messages").launch()
-
+    parser = argparse.ArgumentParser(description="Insurellm keyword RAG chat server")
+    parser.add_argument("--async-chat", action="store_true", help="Serve answers from the asyncio event loop instead of worker threads")
+    args = parser.parse_args()
+
+    if args.async_chat:
+        # The limiter bounds concurrent LLM streams, so Gradio itself need not limit the event
+        view = gr.ChatInterface(async_chat, type="messages", concurrency_limit=None).launch()
+    else:
+        view = gr.ChatInterface(chat, type="messages").launch()
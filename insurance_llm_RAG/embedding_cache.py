@@ -0,0 +1,142 @@
+"""
+Embedding Cache Module
+
+This module wraps a LangChain embeddings object with a persistent SQLite cache
+keyed by the embedding model name and a hash of the text. Cached vectors are
+served without an API call, and all misses of a call are embedded together in
+one batch, so re-running ingestion with different chunking or vector stores
+only pays for text that has never been embedded before.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+
+def embeddings_model_name(embeddings: Embeddings) -> str:
+    """Return the model identifier of an embeddings object, falling back to its class name."""
+    return getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    An Embeddings implementation that serves repeated texts from an on-disk cache.
+    """
+
+    def __init__(self, embeddings: Embeddings, path: str = "embedding_cache.sqlite3"):
+        """
+        Wrap an embeddings object.
+
+        Args:
+            embeddings: The underlying embeddings, called only for cache misses
+            path: SQLite file holding the cached vectors
+        """
+        self.embeddings = embeddings
+        self.model = embeddings_model_name(embeddings)
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (model TEXT, text_hash TEXT, vector BLOB, "
+                         "PRIMARY KEY (model, text_hash))")
+        self._db.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, calling the underlying embeddings once for all uncached texts.
+
+        Args:
+            texts: The texts to embed
+
+        Returns:
+            One vector per text, in order
+        """
+        hashes = [_text_hash(text) for text in texts]
+        vectors = self._lookup(hashes)
+
+        missing: Dict[str, str] = {}
+        bytes_saved = 0
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+            else:
+                bytes_saved += len(text.encode("utf-8"))
+        self._record(len(texts) - len(missing), len(missing), bytes_saved)
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            vectors.update(zip(missing.keys(), new_vectors))
+            self._store(zip(missing.keys(), new_vectors))
+        return [vectors[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query, using the cache for repeated queries.
+
+        Args:
+            text: The query text
+
+        Returns:
+            The query vector
+        """
+        text_hash = _text_hash(text)
+        cached = self._lookup([text_hash]).get(text_hash)
+        if cached is not None:
+            self._record(1, 0, len(text.encode("utf-8")))
+            return cached
+        self._record(0, 1, 0)
+        vector = self.embeddings.embed_query(text)
+        self._store([(text_hash, vector)])
+        return vector
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of texts served from the cache so far."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        """A one-line report of cache effectiveness."""
+        return (f"Embedding cache: {self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), "
+                f"{self.bytes_saved:,} bytes of text not re-sent")
+
+    def _record(self, hits: int, misses: int, bytes_saved: int) -> None:
+        """Update the statistics; embeddings may be requested from several threads."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.bytes_saved += bytes_saved
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """Fetch the cached vectors for a list of text hashes."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [self.model, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+        return found
+
+    def _store(self, items) -> None:
+        """Persist (text_hash, vector) pairs."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(self.model, text_hash, array("f", vector).tobytes()) for text_hash, vector in items],
+            )
+            self._db.commit()
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
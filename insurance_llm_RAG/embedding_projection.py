@@ -0,0 +1,408 @@
+"""
+Embedding Projection Module
+
+This module projects the vector store's embeddings to 2D and 3D for plotting
+without holding every vector in memory or running t-SNE. Vectors are read from
+the store in pages, a PCA is fitted from the streamed covariance, and every
+chunk is kept as a short PCA vector (PCA_COMPONENTS dimensions). From those the
+plot coordinates are either the leading principal components ("pca") or a
+neighbour-graph layout ("graph"): an approximate k-nearest-neighbour graph
+built within k-means clusters, laid out UMAP-style by attracting neighbours and
+repelling random pairs, starting from the PCA coordinates.
+
+A Projection is saved next to the store and keyed on the index manifest. When
+chunks are added or removed only the new chunks are read and projected (into
+the existing PCA, and for graph layouts placed among their nearest projected
+neighbours); a full refit happens only once much of the store has changed.
+"""
+
+import hashlib
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ivf_index import assign, kmeans
+
+PROJECTION_FORMAT_VERSION = 2
+LAYOUTS = ("pca", "graph")
+# Records fetched from the store per get() call
+PAGE_SIZE = 5000
+PCA_COMPONENTS = 50
+# Refit from scratch once more than this share of the chunks was added since the last fit
+REFIT_FRACTION = 0.25
+# Up to this many points the neighbour graph is computed exactly
+EXACT_KNN_ROWS = 5000
+
+
+def manifest_key(ids: Iterable[str]) -> str:
+    """A hash identifying a set of chunk IDs, regardless of order."""
+    digest = hashlib.sha256()
+    for chunk_id in sorted(ids):
+        digest.update(chunk_id.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def iter_pages(vectorstore, include: Sequence[str] = ("embeddings",), ids: Optional[List[str]] = None,
+               page_size: int = PAGE_SIZE) -> Iterator[Dict[str, list]]:
+    """
+    Read records from a vector store one page at a time.
+
+    Args:
+        vectorstore: A LangChain vector store with Chroma-style get() (Chroma or NumpyVectorStore)
+        include: Fields to fetch ("embeddings", "documents", "metadatas")
+        ids: Only read these IDs; by default every record is read with limit/offset paging
+        page_size: Records per get() call
+
+    Yields:
+        get() results with at most page_size records each
+    """
+    if ids is not None:
+        for start in range(0, len(ids), page_size):
+            yield vectorstore.get(ids=ids[start:start + page_size], include=list(include))
+        return
+    offset = 0
+    while True:
+        page = vectorstore.get(limit=page_size, offset=offset, include=list(include))
+        if page["ids"]:
+            yield page
+        if len(page["ids"]) < page_size:
+            return
+        offset += page_size
+
+
+def fit_pca(pages: Iterable[np.ndarray], n_components: int = PCA_COMPONENTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fit a PCA in one pass from the running mean and scatter matrix of streamed vectors.
+
+    Args:
+        pages: (rows, dimensions) matrices, together making up the data set
+        n_components: Principal components to keep (capped by the rows and dimensions seen)
+
+    Returns:
+        (mean, components): the (dimensions,) mean and a (components, dimensions) matrix of
+        principal axes, largest variance first
+    """
+    count, total, scatter = 0, None, None
+    for page in pages:
+        page = np.asarray(page, dtype=np.float64)
+        if total is None:
+            total = np.zeros(page.shape[1])
+            scatter = np.zeros((page.shape[1], page.shape[1]))
+        count += len(page)
+        total += page.sum(axis=0)
+        scatter += page.T @ page
+    if not count:
+        raise ValueError("Cannot fit a projection to an empty vector store")
+    mean = total / count
+    covariance = scatter / count - np.outer(mean, mean)
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    keep = min(n_components, len(mean), count)
+    components = eigenvectors[:, np.argsort(eigenvalues)[::-1][:keep]].T
+    return mean.astype(np.float32), components.astype(np.float32)
+
+
+def knn_graph(points: np.ndarray, n_neighbors: int = 15, probes: int = 3, seed: int = 0) -> np.ndarray:
+    """
+    Find approximately the nearest neighbours (by cosine) of every point.
+
+    Small sets are searched exactly. Larger ones are clustered with k-means into about
+    sqrt(N) cells, and each cell's points are only compared with the points of the
+    `probes` most similar cells.
+
+    Args:
+        points: (N, dimensions) matrix
+        n_neighbors: Neighbours per point
+        probes: Cells searched per cell
+        seed: Seed for the clustering
+
+    Returns:
+        An (N, n_neighbors') matrix of neighbour rows, nearest first, n_neighbors' = min(n_neighbors, N - 1)
+    """
+    unit = points / np.maximum(np.linalg.norm(points, axis=1, keepdims=True), 1e-12)
+    unit = unit.astype(np.float32)
+    k = min(n_neighbors, len(unit) - 1)
+    neighbors = np.empty((len(unit), max(k, 0)), dtype=np.int64)
+    if k <= 0:
+        return neighbors
+
+    if len(unit) <= EXACT_KNN_ROWS:
+        cells = [(np.arange(len(unit)), np.arange(len(unit)))]
+    else:
+        rng = np.random.default_rng(seed)
+        sample = unit[rng.choice(len(unit), min(len(unit), 100_000), replace=False)]
+        centroids = kmeans(sample, int(np.sqrt(len(unit))), iterations=10, seed=seed)
+        assignment = assign(unit, centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))])
+        members = [order[offsets[cell]:offsets[cell + 1]] for cell in range(len(centroids))]
+        cells = []
+        for cell, similarities in enumerate(centroids @ centroids.T):
+            if not len(members[cell]):
+                continue
+            # Take the most similar cells until there are enough candidates
+            candidates, probed = [], 0
+            for other in np.argsort(-similarities):
+                candidates.append(members[other])
+                probed += 1
+                if probed >= probes and sum(len(rows) for rows in candidates) > k:
+                    break
+            cells.append((members[cell], np.concatenate(candidates)))
+
+    for queries, candidates in cells:
+        for start in range(0, len(queries), 1024):
+            block = queries[start:start + 1024]
+            scores = unit[block] @ unit[candidates].T
+            scores[block[:, None] == candidates[None, :]] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            top = np.take_along_axis(top, np.argsort(-top_scores, axis=1), axis=1)
+            neighbors[block] = candidates[top]
+    return neighbors
+
+
+def graph_layout(neighbors: np.ndarray, init: np.ndarray, epochs: int = 200, negative_samples: int = 5,
+                 learning_rate: float = 1.0, seed: int = 0) -> np.ndarray:
+    """
+    Lay out a neighbour graph in low dimensions, UMAP-style.
+
+    Every epoch pulls each point towards its graph neighbours and pushes it away from
+    `negative_samples` random points, with all points updated at once. Similarity in the
+    layout follows the Cauchy kernel 1 / (1 + distance^2), i.e. UMAP's curve with a = b = 1,
+    which keeps each epoch free of fractional powers.
+
+    Args:
+        neighbors: (N, k) neighbour rows from knn_graph
+        init: (N, dims) starting coordinates, e.g. the leading PCA components
+        epochs: Optimization rounds; the step size decays linearly to zero
+        negative_samples: Random repulsions per point per epoch
+        learning_rate: Initial step size
+        seed: Seed for the negative samples
+
+    Returns:
+        (N, dims) float32 coordinates
+    """
+    rng = np.random.default_rng(seed)
+    count, dims = init.shape
+    # Scale the start to the range UMAP's curve is tuned for
+    coords = (init - init.mean(axis=0)) / max(float(np.abs(init).max()), 1e-12) * 10.0
+    coords = coords.astype(np.float32)
+    if not neighbors.size:
+        return coords
+    k = neighbors.shape[1]
+    tails = neighbors.ravel()
+    # Each point has k outgoing and on average k incoming edges; UMAP pairs every edge with
+    # negative_samples repulsions, so the sampled repulsions are weighted by k / negative_samples
+    repulsion_weight = k / negative_samples
+
+    for epoch in range(epochs):
+        alpha = np.float32(learning_rate * (1.0 - epoch / epochs))
+        delta = np.repeat(coords, k, axis=0) - coords[tails]
+        distance = (delta * delta).sum(axis=1)
+        move = np.clip((-2.0 / (1.0 + distance))[:, None] * delta, -4.0, 4.0) * alpha
+
+        others = rng.integers(0, count, size=count * negative_samples)
+        delta = np.repeat(coords, negative_samples, axis=0) - coords[others]
+        distance = (delta * delta).sum(axis=1)
+        push = 2.0 / ((0.001 + distance) * (1.0 + distance))
+        push[others == np.repeat(np.arange(count), negative_samples)] = 0.0
+        push_move = np.clip(push[:, None] * delta, -4.0, 4.0) * alpha
+
+        step = move.reshape(count, k, dims).sum(axis=1)
+        step += repulsion_weight * push_move.reshape(count, negative_samples, dims).sum(axis=1)
+        for dim in range(dims):
+            # bincount sums the moves of each edge's far end (much faster than np.add.at)
+            step[:, dim] -= np.bincount(tails, move[:, dim], minlength=count)
+        coords += step / (2 * k)
+    return coords
+
+
+def downsample(labels: Sequence[str], max_points: int, seed: int = 0) -> np.ndarray:
+    """
+    Choose at most max_points rows, keeping each label's share (and at least one row per label).
+
+    Args:
+        labels: A label (e.g. doc_type) per row
+        max_points: Rows to keep
+
+    Returns:
+        The chosen rows in ascending order
+    """
+    if len(labels) <= max_points:
+        return np.arange(len(labels))
+    rng = np.random.default_rng(seed)
+    labels = np.asarray(labels)
+    chosen = []
+    for label in np.unique(labels):
+        rows = np.flatnonzero(labels == label)
+        take = max(1, int(round(len(rows) * max_points / len(labels))))
+        chosen.append(rng.choice(rows, min(take, len(rows)), replace=False))
+    return np.sort(np.concatenate(chosen))
+
+
+class Projection:
+    """
+    PCA-reduced vectors of every chunk in a store, with cached 2D and 3D layouts.
+    """
+
+    def __init__(self, ids: List[str], mean: np.ndarray, components: np.ndarray, reduced: np.ndarray,
+                 key: str = "", fitted: int = 0):
+        """
+        Wrap a fitted projection; use Projection.fit, Projection.load or Projection.update to get one.
+
+        Args:
+            ids: Chunk IDs, one per row of reduced
+            mean: PCA mean
+            components: PCA axes
+            reduced: (N, components) PCA coordinates of every chunk
+            key: manifest_key of ids
+            fitted: Number of chunks the PCA and layouts were fitted on
+        """
+        self.ids = list(ids)
+        self.mean = mean
+        self.components = components
+        self.reduced = reduced
+        self.key = key or manifest_key(self.ids)
+        self.fitted = fitted or len(self.ids)
+        self.layouts: Dict[str, np.ndarray] = {}
+        self.added = 0
+        self.removed = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def fit(cls, vectorstore, n_components: int = PCA_COMPONENTS, page_size: int = PAGE_SIZE) -> "Projection":
+        """
+        Fit a projection to every vector in a store, in two streamed passes.
+
+        Args:
+            vectorstore: A LangChain vector store with Chroma-style get()
+            n_components: PCA dimensions kept per chunk
+            page_size: Records per get() call
+
+        Returns:
+            The projection
+        """
+        pages = (np.asarray(page["embeddings"], dtype=np.float32) for page in iter_pages(vectorstore, page_size=page_size))
+        mean, components = fit_pca(pages, n_components)
+        ids, reduced = [], []
+        for page in iter_pages(vectorstore, page_size=page_size):
+            ids.extend(page["ids"])
+            reduced.append((np.asarray(page["embeddings"], dtype=np.float32) - mean) @ components.T)
+        return cls(ids, mean, components, np.concatenate(reduced))
+
+    def update(self, vectorstore, ids: List[str], page_size: int = PAGE_SIZE) -> "Projection":
+        """
+        Bring the projection up to date with the store's current chunk IDs.
+
+        Removed chunks are dropped and only new chunks are read and projected. Cached graph
+        layouts place each new chunk at the mean position of its nearest projected neighbours.
+        When more than REFIT_FRACTION of the chunks are new since the last fit, everything
+        is refitted instead.
+
+        Args:
+            vectorstore: The store the projection was fitted on
+            ids: The IDs the store holds now (e.g. from the index manifest)
+            page_size: Records per get() call
+
+        Returns:
+            This projection updated in place, or a new one if it was refitted
+        """
+        current = set(ids)
+        known = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        new_ids = [chunk_id for chunk_id in ids if chunk_id not in known]
+        keep = np.array([row for row, chunk_id in enumerate(self.ids) if chunk_id in current], dtype=np.int64)
+        if self.added + len(new_ids) > REFIT_FRACTION * max(len(ids), 1) or not len(keep):
+            return Projection.fit(vectorstore, len(self.components), page_size)
+
+        added_ids, added = [], []
+        for page in iter_pages(vectorstore, ids=new_ids, page_size=page_size):
+            added_ids.extend(page["ids"])
+            added.append((np.asarray(page["embeddings"], dtype=np.float32) - self.mean) @ self.components.T)
+        added = np.concatenate(added) if added else np.empty((0, len(self.components)), dtype=np.float32)
+
+        self.removed += len(self.ids) - len(keep)
+        self.added += len(added_ids)
+        for name, coords in list(self.layouts.items()):
+            if name.startswith("pca"):
+                del self.layouts[name]
+            else:
+                self.layouts[name] = np.concatenate([coords[keep], self._place(self.reduced[keep], coords[keep], added)])
+        self.ids = [self.ids[row] for row in keep] + added_ids
+        self.reduced = np.concatenate([self.reduced[keep], added])
+        self.key = manifest_key(self.ids)
+        return self
+
+    def coordinates(self, layout: str = "pca", dims: int = 2, n_neighbors: int = 15, epochs: int = 200) -> np.ndarray:
+        """
+        Return (N, dims) plot coordinates in the given layout, computing them on first use.
+
+        Args:
+            layout: "pca" for the leading principal components, or "graph" for the neighbour-graph layout
+            dims: 2 or 3
+            n_neighbors: Neighbours per point in the graph
+            epochs: Graph layout optimization rounds
+
+        Returns:
+            Coordinates in the order of ids
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}; expected one of {LAYOUTS}")
+        name = f"{layout}{dims}"
+        if name not in self.layouts:
+            init = self.reduced[:, :dims]
+            if init.shape[1] < dims:
+                init = np.pad(init, ((0, 0), (0, dims - init.shape[1])))
+            if layout == "pca":
+                self.layouts[name] = init.astype(np.float32)
+            else:
+                self.layouts[name] = graph_layout(knn_graph(self.reduced, n_neighbors), init, epochs)
+        return self.layouts[name]
+
+    def save(self, path: str) -> None:
+        """Write the projection and its layouts to a .npz file, replacing it atomically."""
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, version=PROJECTION_FORMAT_VERSION, ids=np.array(self.ids), mean=self.mean,
+                 components=self.components, reduced=self.reduced, key=self.key, fitted=self.fitted,
+                 added=self.added, removed=self.removed,
+                 **{f"layout_{name}": coords for name, coords in self.layouts.items()})
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Projection"]:
+        """Load a saved projection, or return None if there is none (or it is from another format version)."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if int(data["version"]) != PROJECTION_FORMAT_VERSION:
+                return None
+            projection = cls(data["ids"].tolist(), data["mean"], data["components"], data["reduced"],
+                             str(data["key"]), int(data["fitted"]))
+            projection.added, projection.removed = int(data["added"]), int(data["removed"])
+            for name in data.files:
+                if name.startswith("layout_"):
+                    projection.layouts[name[len("layout_"):]] = data[name]
+        return projection
+
+    def summary(self) -> str:
+        """A one-line report of the projection's state."""
+        return (f"Projection: {len(self.ids):,} chunks in {len(self.components)} PCA dimensions, "
+                f"{self.added} added and {self.removed} removed since the fit on {self.fitted:,}, "
+                f"cached layouts: {', '.join(sorted(self.layouts)) or 'none'}")
+
+    @staticmethod
+    def _place(reduced: np.ndarray, coords: np.ndarray, new_points: np.ndarray, k: int = 5) -> np.ndarray:
+        """Position new points at the mean coordinates of their k most similar existing points."""
+        if not len(new_points):
+            return np.empty((0, coords.shape[1]), dtype=coords.dtype)
+        unit = reduced / np.maximum(np.linalg.norm(reduced, axis=1, keepdims=True), 1e-12)
+        new_unit = new_points / np.maximum(np.linalg.norm(new_points, axis=1, keepdims=True), 1e-12)
+        k = min(k, len(unit))
+        placed = np.empty((len(new_points), coords.shape[1]), dtype=coords.dtype)
+        for start in range(0, len(new_points), 1024):
+            scores = new_unit[start:start + 1024] @ unit.T
+            nearest = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            placed[start:start + 1024] = coords[nearest].mean(axis=1)
+        return placed
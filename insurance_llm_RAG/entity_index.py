@@ -0,0 +1,123 @@
+"""
+Entity Index Module
+
+This module provides a character-trigram index over entity aliases (people's
+full names, first names and surnames, product names) for typo-tolerant lookup:
+"Thompsen" finds "Thompson" and "Carlm" finds "Carllm". Trigram overlap picks a
+handful of candidates by touching only the postings of the query's trigrams,
+and edit distance decides which of them really match, so lookups stay fast as
+the directory grows.
+"""
+
+from array import array
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Set, Tuple
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the padded character trigrams of a lowercased string."""
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class EntityIndex:
+    """
+    Maps aliases to entities and finds the aliases most similar to a word.
+
+    Similarity is 1 - edit distance / length of the longer string, so one typo in
+    an eight-letter name scores 0.875.
+    """
+
+    def __init__(self, threshold: float = 0.75):
+        """
+        Initialize an empty index.
+
+        Args:
+            threshold: Minimum similarity (0-1) for a fuzzy match
+        """
+        self.threshold = threshold
+        self.aliases: List[str] = []
+        self._alias_ids: Dict[str, int] = {}
+        self._entities: List[List[str]] = []
+        self._sizes = array("H")
+        self._lengths = array("H")
+        self._postings: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def add(self, alias: str, entity: str) -> None:
+        """
+        Register an alias for an entity. An alias may name several entities.
+
+        Args:
+            alias: A name the entity is known by
+            entity: The entity identifier returned by lookup()
+        """
+        key = alias.lower()
+        alias_id = self._alias_ids.get(key)
+        if alias_id is None:
+            alias_id = self._alias_ids[key] = len(self.aliases)
+            self.aliases.append(alias)
+            self._entities.append([])
+            grams = trigrams(key)
+            self._sizes.append(len(grams))
+            self._lengths.append(len(key))
+            for gram in grams:
+                self._postings.setdefault(gram, array("I")).append(alias_id)
+        if entity not in self._entities[alias_id]:
+            self._entities[alias_id].append(entity)
+
+    def lookup(self, word: str, limit: int = 5) -> List[Tuple[str, str, float]]:
+        """
+        Find the entities whose aliases are most similar to a word.
+
+        Args:
+            word: The (possibly misspelled) name to look up
+            limit: Maximum number of aliases to consider
+
+        Returns:
+            (entity, alias, similarity) triples, best first, at or above the threshold
+        """
+        word = word.lower()
+        grams = trigrams(word)
+        shared = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in grams))
+
+        # Each edit destroys at most three trigrams, so aliases that share too few with the
+        # word (or differ too much in length) can't be within the allowed edit distance
+        longest_edits = int((1 - self.threshold) * len(word) / self.threshold + 1e-9)
+        minimum_shared = len(grams) - 3 * longest_edits
+        scored = []
+        for alias_id, count in [(alias_id, count) for alias_id, count in shared.items() if count >= minimum_shared]:
+            alias_length = self._lengths[alias_id]
+            longest = max(len(word), alias_length)
+            max_edits = int((1 - self.threshold) * longest + 1e-9)
+            if abs(len(word) - alias_length) > max_edits:
+                continue
+            if count < max(len(grams), self._sizes[alias_id]) - 3 * max_edits:
+                continue
+            alias = self.aliases[alias_id].lower()
+            similarity = 1 - edit_distance(word, alias) / longest
+            if similarity >= self.threshold:
+                scored.append((similarity, alias_id))
+        scored.sort(reverse=True)
+
+        return [
+            (entity, self.aliases[alias_id], similarity)
+            for similarity, alias_id in scored[:limit]
+            for entity in self._entities[alias_id]
+        ]
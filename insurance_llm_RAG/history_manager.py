@@ -0,0 +1,106 @@
+"""
+History Manager Module
+
+This module keeps the conversation history sent with each question within a
+token budget. The most recent turns are kept verbatim; older turns are dropped
+or, if a summarizer is supplied, replaced by a short summary.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from tokens import DEFAULT_MODEL, count_tokens, truncate_to_tokens
+
+# Approximate per-message overhead of the chat format (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class CompactedHistory(NamedTuple):
+    """History trimmed to the budget, with its size and how many messages were left out."""
+    messages: List[Dict[str, str]]
+    tokens: int
+    dropped: int
+
+
+class HistoryManager:
+    """
+    Compacts chat history (OpenAI/Gradio "messages" format) to a token budget.
+    """
+
+    def __init__(self, token_budget: int = 2000, summarizer: Optional[Callable[[List[Dict[str, str]]], str]] = None,
+                 summary_tokens: int = 300, model: str = DEFAULT_MODEL, max_cached_summaries: int = 256):
+        """
+        Initialize the manager.
+
+        Args:
+            token_budget: Maximum tokens of history to send with a question
+            summarizer: Optional callable that condenses dropped messages into a short text;
+                if None, messages that don't fit are simply dropped
+            summary_tokens: Part of the budget reserved for the summary when a summarizer is used
+            model: Model whose tokenizer should be used for counting
+            max_cached_summaries: Summaries are cached by the messages they cover, so retries
+                and concurrent tabs with the same history don't summarize it again
+        """
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary_tokens = summary_tokens
+        self.model = model
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+
+    def count(self, messages: Iterable[Dict[str, str]]) -> int:
+        """Count the tokens a list of messages will take up in a prompt."""
+        return sum(count_tokens(_content(message), self.model) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+    def compact(self, history: List[Dict[str, str]]) -> CompactedHistory:
+        """
+        Keep the most recent messages that fit the budget.
+
+        Messages are kept from the newest backwards, always starting on a user message
+        so that no answer is sent without its question.
+
+        Args:
+            history: The conversation so far, oldest first
+
+        Returns:
+            The messages to send, their token count and the number of messages left out
+        """
+        budget = self.token_budget if self.summarizer is None else self.token_budget - self.summary_tokens
+        kept: List[Dict[str, str]] = []
+        tokens = 0
+        for message in reversed(history):
+            message_tokens = self.count([message])
+            if tokens + message_tokens > budget:
+                break
+            kept.append(message)
+            tokens += message_tokens
+        while kept and kept[-1].get("role") != "user":
+            tokens -= self.count([kept.pop()])
+        kept.reverse()
+
+        older = history[:len(history) - len(kept)]
+        if older and self.summarizer is not None:
+            text = truncate_to_tokens(self._summarize(older), self.summary_tokens - MESSAGE_OVERHEAD_TOKENS - 8, self.model)
+            summary = {"role": "system", "content": "Summary of the earlier conversation: " + text}
+            return CompactedHistory([summary] + kept, tokens + self.count([summary]), len(older))
+        return CompactedHistory(kept, tokens, len(older))
+
+    def _summarize(self, messages: List[Dict[str, str]]) -> str:
+        """Summarize messages, reusing the summary from an earlier turn when possible."""
+        key = hashlib.sha256(json.dumps([[m.get("role"), _content(m)] for m in messages]).encode("utf-8")).hexdigest()
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self.summarizer(messages)
+            self._summaries[key] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        else:
+            self._summaries.move_to_end(key)
+        return summary
+
+
+def _content(message: Dict[str, str]) -> str:
+    content = message.get("content")
+    return content if isinstance(content, str) else str(content or "")
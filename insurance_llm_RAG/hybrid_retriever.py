@@ -0,0 +1,142 @@
+"""
+Hybrid Retriever Module
+
+This module combines keyword (BM25) and dense (embedding) retrieval. Dense
+search finds paraphrases but can rank exact tokens such as client names or
+product codes ("Rellm", "IIOTY") poorly; BM25 is the opposite. Both searches
+run in parallel and their rankings are merged with reciprocal rank fusion
+(RRF), which needs no score calibration between the two, so a small k reaches
+the recall that dense search alone only gets with a large one.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from bm25_index import BM25Index
+
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+    """
+    Merge ranked ID lists by summing weight / (k + rank) for every list an ID appears in.
+
+    Args:
+        rankings: Ranked lists of IDs, best first
+        k: Rank offset; larger values flatten the difference between top and lower ranks
+        weights: Optional weight per ranking (default 1 each)
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridIndex:
+    """
+    A BM25 index over the chunks of a vector store, searched together with the store itself.
+    """
+
+    def __init__(self, vectorstore, candidates: int = 20, rrf_k: int = RRF_K, dense_weight: float = 1.0,
+                 keyword_weight: float = 1.0):
+        """
+        Index every chunk currently in the vector store.
+
+        Args:
+            vectorstore: A LangChain vector store with Chroma-style get() (Chroma or NumpyVectorStore)
+            candidates: Results taken from each of the two searches before fusion
+            rrf_k: Rank offset for reciprocal rank fusion
+            dense_weight: RRF weight of the dense ranking
+            keyword_weight: RRF weight of the BM25 ranking
+        """
+        self.vectorstore = vectorstore
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.weights = (dense_weight, keyword_weight)
+
+        records = vectorstore.get(include=["documents", "metadatas"])
+        self.documents: Dict[str, Document] = {}
+        self._ids_by_text: Dict[str, str] = {}
+        self.bm25 = BM25Index()
+        for doc_id, text, metadata in zip(records["ids"], records["documents"], records["metadatas"]):
+            self.documents[doc_id] = Document(id=doc_id, page_content=text, metadata=metadata or {})
+            self._ids_by_text.setdefault(text, doc_id)
+            self.bm25.add(doc_id, text)
+        self.bm25.build()
+        # Dense search (with its embedding request) runs in each caller's thread, so concurrent sessions
+        # don't queue behind each other; only BM25, which is CPU-bound and holds the GIL, goes to the pool
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="keyword-search")
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int = 8, filter: Optional[dict] = None) -> List[Document]:
+        """
+        Return the k best chunks by fused dense and keyword rank.
+
+        Args:
+            query: The search query
+            k: Number of chunks to return
+            filter: Optional metadata equality filter, e.g. {"doc_type": "contracts"}, applied to both searches
+
+        Returns:
+            The chunks, best first
+        """
+        return [self.documents[doc_id] for doc_id, _ in self.rank(query, filter)[:k]]
+
+    def rank(self, query: str, filter: Optional[dict] = None,
+             query_vector: Optional[List[float]] = None) -> List[Tuple[str, float]]:
+        """
+        Return every candidate's (chunk ID, fused score), best first.
+
+        Args:
+            query: The search query
+            filter: Optional metadata equality filter
+            query_vector: The query's embedding, if the caller already has it
+        """
+        keyword = self._pool.submit(self.keyword_ids, query, filter)
+        dense = self.dense_ids(query, filter, query_vector)
+        return reciprocal_rank_fusion([dense, keyword.result()], self.rrf_k, self.weights)
+
+    def dense_ids(self, query: str, filter: Optional[dict] = None,
+                  query_vector: Optional[List[float]] = None) -> List[str]:
+        """Chunk IDs from the vector store, best first."""
+        kwargs = {"filter": filter} if filter else {}
+        if query_vector is not None:
+            results = self.vectorstore.similarity_search_by_vector(query_vector, k=self.candidates, **kwargs)
+        else:
+            results = self.vectorstore.similarity_search(query, k=self.candidates, **kwargs)
+        # Not every store version returns Document.id; fall back to matching the text
+        return [doc.id or self._ids_by_text.get(doc.page_content) for doc in results
+                if doc.id or doc.page_content in self._ids_by_text]
+
+    def keyword_ids(self, query: str, filter: Optional[dict] = None) -> List[str]:
+        """Chunk IDs from BM25, best first."""
+        doc_filter = None
+        if filter:
+            doc_filter = lambda doc_id: all(self.documents[doc_id].metadata.get(key) == value
+                                            for key, value in filter.items())
+        return [doc_id for doc_id, _ in self.bm25.search(query, self.candidates, doc_filter=doc_filter)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    LangChain retriever over a HybridIndex, usable anywhere `vectorstore.as_retriever()` is.
+    """
+
+    index: HybridIndex
+    k: int = 8
+    filter: Optional[dict] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.index.search(query, self.k, self.filter)
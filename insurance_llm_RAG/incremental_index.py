@@ -0,0 +1,120 @@
+"""
+Incremental Index Module
+
+This module keeps a persisted vector store in sync with the current chunks of the
+knowledge base without re-embedding what is already there. Every chunk gets a
+stable ID derived from a hash of its text and metadata, and a JSON manifest next
+to the store records which IDs are indexed, so a rebuild only embeds new or
+changed chunks and deletes the ones that disappeared.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from langchain_core.documents import Document
+
+MANIFEST_VERSION = 1
+
+
+class SyncResult(NamedTuple):
+    """What a sync changed in the vector store."""
+    added: int
+    removed: int
+    unchanged: int
+
+
+def chunk_id(chunk: Document) -> str:
+    """
+    Return a stable ID for a chunk, derived from its content and metadata.
+
+    Args:
+        chunk: The chunk to identify
+
+    Returns:
+        A hex digest that changes whenever the text or metadata changes
+    """
+    payload = json.dumps({"text": chunk.page_content, "metadata": chunk.metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: str) -> Dict[str, dict]:
+    """
+    Load the indexed chunk IDs recorded by the last sync.
+
+    Args:
+        path: Manifest file path
+
+    Returns:
+        Mapping of chunk ID to its recorded metadata, or an empty dict if there is no manifest
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest["chunks"]
+
+
+def save_manifest(path: str, chunks: Dict[str, dict]) -> None:
+    """Atomically write the manifest."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "updated": time.time(), "chunks": chunks}, f)
+    os.replace(temp_path, path)
+
+
+def sync_vectorstore(vectorstore, chunks: List[Document], manifest_path: str, batch_size: int = 1000,
+                     ingestor=None, save: Optional[Callable[[], None]] = None) -> SyncResult:
+    """
+    Make the vector store contain exactly the given chunks.
+
+    New or changed chunks are embedded and added under their content-hash IDs,
+    chunks that are no longer present are deleted, and everything else is left alone.
+    The manifest is written last, so a sync that fails part-way is redone on the next run.
+
+    Args:
+        vectorstore: A LangChain vector store supporting add_documents(ids=...) and delete(ids=...)
+        chunks: The current chunks of the knowledge base
+        manifest_path: Where to record the indexed chunk IDs
+        batch_size: Chunks per add_documents or delete call
+        ingestor: Optional ingestion.RateLimitedIngestor used to embed and write new chunks
+            concurrently; without one, chunks are added through vectorstore.add_documents
+        save: Optional callback that persists a store which does not save itself (such as
+            NumpyVectorStore), called before the manifest is written
+
+    Returns:
+        Counts of added, removed and unchanged chunks
+    """
+    current: Dict[str, Document] = {}
+    for chunk in chunks:
+        current.setdefault(chunk_id(chunk), chunk)
+
+    if os.path.exists(manifest_path):
+        indexed = set(load_manifest(manifest_path))
+    else:
+        # No manifest (first run, or a store built by an older version): trust the store itself
+        indexed = set(vectorstore.get(include=[])["ids"])
+
+    to_add = [key for key in current if key not in indexed]
+    to_remove = [key for key in indexed if key not in current]
+
+    for start in range(0, len(to_remove), batch_size):
+        vectorstore.delete(ids=to_remove[start:start + batch_size])
+    if ingestor is not None:
+        ingestor.ingest((current[key] for key in to_add), to_add)
+    else:
+        for start in range(0, len(to_add), batch_size):
+            batch = to_add[start:start + batch_size]
+            vectorstore.add_documents([current[key] for key in batch], ids=batch)
+    if save is not None:
+        save()
+
+    save_manifest(manifest_path, {
+        key: {"source": chunk.metadata.get("source"), "doc_type": chunk.metadata.get("doc_type")}
+        for key, chunk in current.items()
+    })
+    return SyncResult(added=len(to_add), removed=len(to_remove), unchanged=len(current) - len(to_add))
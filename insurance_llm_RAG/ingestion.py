@@ -0,0 +1,200 @@
+"""
+Ingestion Module
+
+This module embeds chunks and writes them to a vector store with a bounded
+pool of concurrent embedding requests. Chunks are streamed into batches capped
+by count and size, the number of requests in flight adapts to the provider's
+rate limits (halved on every 429, grown back one step at a time on success),
+and each batch is written to the store as soon as its vectors arrive.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+Batch = List[Tuple[Document, str]]
+Writer = Callable[[List[Document], List[str], List[List[float]]], None]
+
+
+class IngestStats(NamedTuple):
+    """Totals for one ingest() call."""
+    chunks: int
+    batches: int
+    rate_limited: int
+    seconds: float
+
+    def summary(self) -> str:
+        rate = self.chunks / self.seconds if self.seconds else 0.0
+        return (f"Ingested {self.chunks} chunks in {self.batches} batches in {self.seconds:.1f}s "
+                f"({rate:.0f} chunks/s, {self.rate_limited} rate-limited requests)")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Return True if an exception is an HTTP 429 from the embeddings provider."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Return the provider's Retry-After hint from a rate-limit error, if it sent one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def chroma_writer(vectorstore) -> Writer:
+    """
+    Return a writer that upserts embedded chunks straight into a LangChain Chroma store.
+
+    Args:
+        vectorstore: The Chroma vector store
+
+    Returns:
+        A callable taking (documents, ids, vectors)
+    """
+    def write(documents: List[Document], ids: List[str], vectors: List[List[float]]) -> None:
+        vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[document.page_content for document in documents],
+            metadatas=[document.metadata or None for document in documents],
+        )
+    return write
+
+
+class RateLimitedIngestor:
+    """
+    Embeds chunks concurrently within the provider's rate limits and writes them as they complete.
+    """
+
+    def __init__(self, embeddings: Embeddings, write: Writer, batch_size: int = 128, max_batch_chars: int = 200_000,
+                 max_concurrency: int = 8, max_retries: int = 8, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Initialize the ingestor.
+
+        Args:
+            embeddings: Embeddings used for the chunk texts
+            write: Callable that stores (documents, ids, vectors); always called from the calling thread
+            batch_size: Maximum chunks per embedding request
+            max_batch_chars: Maximum characters per embedding request, to stay under request token limits
+            max_concurrency: Upper bound on embedding requests in flight
+            max_retries: Attempts per batch after a rate-limit error before giving up
+            base_delay: First backoff delay in seconds, doubled on each retry
+            max_delay: Longest backoff delay in seconds
+        """
+        self.embeddings = embeddings
+        self.write = write
+        self.batch_size = batch_size
+        self.max_batch_chars = max_batch_chars
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.concurrency = max_concurrency
+        self.stats: Optional[IngestStats] = None
+        self._successes = 0
+        self._rate_limited = 0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def ingest(self, documents: Iterable[Document], ids: Iterable[str]) -> IngestStats:
+        """
+        Embed and store chunks.
+
+        Args:
+            documents: The chunks to ingest; consumed lazily
+            ids: One ID per chunk
+
+        Returns:
+            Totals for this call
+
+        Raises:
+            Exception: The first non-rate-limit error, or a rate-limit error that outlasted max_retries
+        """
+        start = time.perf_counter()
+        self._rate_limited = 0
+        chunks = 0
+        batches = 0
+        pending: Set[Future] = set()
+
+        def drain(done: Set[Future]) -> None:
+            nonlocal chunks, batches
+            for future in done:
+                pending.discard(future)
+                batch, vectors = future.result()
+                self.write([document for document, _ in batch], [chunk_id for _, chunk_id in batch], vectors)
+                chunks += len(batch)
+                batches += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed") as pool:
+            try:
+                for batch in self._batches(zip(documents, ids)):
+                    while len(pending) >= self.concurrency:
+                        drain(wait(pending, return_when=FIRST_COMPLETED).done)
+                    pending.add(pool.submit(self._embed, batch))
+                while pending:
+                    drain(wait(pending, return_when=FIRST_COMPLETED).done)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+        self.stats = IngestStats(chunks, batches, self._rate_limited, time.perf_counter() - start)
+        return self.stats
+
+    def _batches(self, items: Iterable[Tuple[Document, str]]) -> Iterator[Batch]:
+        """Group chunks into batches bounded by count and total characters."""
+        batch: Batch = []
+        batch_chars = 0
+        for document, chunk_id in items:
+            size = len(document.page_content)
+            if batch and (len(batch) >= self.batch_size or batch_chars + size > self.max_batch_chars):
+                yield batch
+                batch, batch_chars = [], 0
+            batch.append((document, chunk_id))
+            batch_chars += size
+        if batch:
+            yield batch
+
+    def _embed(self, batch: Batch) -> Tuple[Batch, List[List[float]]]:
+        """Embed one batch, backing off and retrying on rate-limit errors."""
+        texts = [document.page_content for document, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            # Respect a backoff triggered by any worker, not just this one
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._on_rate_limit(attempt, retry_after_seconds(e))
+                continue
+            self._on_success()
+            return batch, vectors
+
+    def _on_rate_limit(self, attempt: int, retry_after: Optional[float]) -> None:
+        """Halve the allowed concurrency and pause all workers."""
+        delay = retry_after if retry_after is not None else min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay *= random.uniform(0.75, 1.25)
+        with self._lock:
+            self._rate_limited += 1
+            self.concurrency = max(1, self.concurrency // 2)
+            self._successes = 0
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+    def _on_success(self) -> None:
+        """Grow the allowed concurrency by one after a full window of successful requests."""
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._successes = 0
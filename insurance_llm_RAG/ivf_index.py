@@ -0,0 +1,258 @@
+"""
+IVF Index Module
+
+This module implements an inverted-file (IVF) approximate nearest neighbour
+index over unit vectors, with optional product quantization (PQ), in plain
+NumPy. Vectors are clustered around `n_lists` k-means centroids and stored
+grouped by cluster; a query only scores the vectors of its `n_probe` closest
+clusters, so search cost grows with n_probe / n_lists of the corpus instead of
+all of it. With PQ, each vector is stored as `pq_subvectors` one-byte codes and
+scored through a per-query lookup table, cutting memory by up to 4 * d / m.
+
+The index is saved as plain .npy files and loaded with memory maps, so opening
+even a large index is instant.
+"""
+
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+INDEX_FORMAT_VERSION = 1
+PQ_CENTROIDS = 256
+# Codebooks are trained on at most this many sampled vectors; each has only 256 centroids in a few dimensions
+PQ_TRAIN_SIZE = PQ_CENTROIDS * 64
+
+
+def kmeans(vectors: np.ndarray, clusters: int, iterations: int = 20, spherical: bool = True,
+           seed: int = 0) -> np.ndarray:
+    """
+    Cluster vectors with Lloyd's algorithm.
+
+    Args:
+        vectors: float32 matrix to cluster
+        clusters: Number of centroids
+        iterations: Refinement rounds
+        spherical: Assign by dot product and keep centroids unit length (for cosine),
+            instead of Euclidean distance
+        seed: Seed for initialization and re-seeding empty clusters
+
+    Returns:
+        A (clusters, dimensions) float32 matrix of centroids
+    """
+    rng = np.random.default_rng(seed)
+    clusters = min(clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = assign(vectors, centroids, spherical)
+        counts = np.bincount(assignment, minlength=clusters)
+        # Sum each cluster's members as contiguous runs of the sorted vectors (much faster than np.add.at)
+        order = np.argsort(assignment, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        empty = counts == 0
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(vectors[order], starts[~empty])
+        centroids = sums / np.maximum(counts, 1)[:, None]
+        # Re-seed empty clusters with random points so every list gets used
+        centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        if spherical:
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray, spherical: bool = True, block_rows: int = 16384) -> np.ndarray:
+    """Return the index of the nearest centroid for every vector."""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    squared_norms = None if spherical else (centroids ** 2).sum(axis=1)
+    for start in range(0, len(vectors), block_rows):
+        scores = vectors[start:start + block_rows] @ centroids.T
+        if squared_norms is not None:
+            # argmin ||x - c||^2 == argmax (2 x.c - ||c||^2)
+            scores = 2 * scores - squared_norms
+        assignment[start:start + block_rows] = scores.argmax(axis=1)
+    return assignment
+
+
+class IVFIndex:
+    """
+    Approximate inner-product search over normalized vectors with an inverted file and optional PQ.
+    """
+
+    def __init__(self, n_lists: int = 256, n_probe: int = 8, pq_subvectors: int = 0, train_size: int = 100_000,
+                 iterations: int = 20, seed: int = 0):
+        """
+        Configure the index.
+
+        Args:
+            n_lists: Number of k-means clusters (build parameter); around sqrt(N) to 4 * sqrt(N) works well
+            n_probe: Clusters scored per query (search parameter); higher is slower and more accurate
+            pq_subvectors: Bytes per stored vector with product quantization; 0 stores float32 vectors.
+                Must divide the vector dimension
+            train_size: Maximum vectors sampled to train the centroids and codebooks
+            iterations: k-means rounds
+            seed: Random seed for training
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.pq_subvectors = pq_subvectors
+        self.train_size = train_size
+        self.iterations = iterations
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None     # list i holds positions offsets[i]:offsets[i + 1]
+        self.rows: Optional[np.ndarray] = None        # original row number of each stored position
+        self.vectors: Optional[np.ndarray] = None     # float32 vectors by position (without PQ)
+        self.codes: Optional[np.ndarray] = None       # uint8 PQ codes by position (with PQ)
+        self.codebooks: Optional[np.ndarray] = None   # (pq_subvectors, 256, dimensions / pq_subvectors)
+
+    def __len__(self) -> int:
+        return 0 if self.rows is None else len(self.rows)
+
+    def memory_bytes(self) -> int:
+        """Size of all index arrays."""
+        arrays = (self.centroids, self.offsets, self.rows, self.vectors, self.codes, self.codebooks)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def check_dimensions(self, dimensions: int) -> None:
+        """
+        Check that the index can be built over vectors of a dimension, before anything is embedded.
+
+        Raises:
+            ValueError: If pq_subvectors does not divide the dimension
+        """
+        if self.pq_subvectors and dimensions % self.pq_subvectors:
+            raise ValueError(f"pq_subvectors={self.pq_subvectors} does not divide the dimension {dimensions}")
+
+    def build(self, vectors: np.ndarray) -> "IVFIndex":
+        """
+        Train the index on a corpus and add all of it; rows are numbered in input order.
+
+        Args:
+            vectors: (N, dimensions) matrix of unit vectors
+
+        Returns:
+            self
+
+        Raises:
+            ValueError: If pq_subvectors does not divide the dimension
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.check_dimensions(vectors.shape[1])
+
+        rng = np.random.default_rng(self.seed)
+        sample = vectors if len(vectors) <= self.train_size else vectors[rng.choice(len(vectors), self.train_size, replace=False)]
+        self.centroids = kmeans(sample, self.n_lists, self.iterations, spherical=True, seed=self.seed)
+
+        assignment = assign(vectors, self.centroids)
+        order = np.argsort(assignment, kind="stable")
+        self.rows = order.astype(np.int64)
+        self.offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=len(self.centroids)), out=self.offsets[1:])
+
+        if self.pq_subvectors:
+            self.codebooks = self._train_codebooks(sample)
+            self.codes = self._encode(vectors[order])
+            self.vectors = None
+        else:
+            self.vectors = vectors[order]
+            self.codes = None
+        return self
+
+    def search(self, queries: np.ndarray, k: int = 10, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximately the k most similar vectors for each query.
+
+        Args:
+            queries: A (dimensions,) vector or (queries, dimensions) matrix of unit vectors
+            k: Results per query
+            n_probe: Clusters to scan; defaults to the index's n_probe
+
+        Returns:
+            (rows, scores), each of shape (queries, k), best first. Queries whose probed clusters
+            hold fewer than k vectors are padded with row -1 and score -inf
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, n_probe - 1, axis=1)[:, :n_probe] if n_probe < coarse.shape[1] \
+            else np.broadcast_to(np.arange(coarse.shape[1]), coarse.shape)
+
+        all_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for number, (query, lists) in enumerate(zip(queries, probes)):
+            positions = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+            if not len(positions):
+                continue
+            scores = self._score(query, positions)
+            top = min(k, len(positions))
+            best = np.argpartition(-scores, top - 1)[:top] if top < len(scores) else np.arange(len(scores))
+            best = best[np.argsort(-scores[best])]
+            all_rows[number, :top] = self.rows[positions[best]]
+            all_scores[number, :top] = scores[best]
+        return all_rows, all_scores
+
+    def _score(self, query: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        if self.codes is None:
+            return self.vectors[positions] @ query
+        # Asymmetric distance: the query stays exact, stored vectors are looked up by code
+        subvectors = self.codebooks.shape[0]
+        table = np.einsum("msd,md->ms", self.codebooks, query.reshape(subvectors, -1))
+        return table[np.arange(subvectors), self.codes[positions]].sum(axis=1)
+
+    def _train_codebooks(self, sample: np.ndarray) -> np.ndarray:
+        if len(sample) > PQ_TRAIN_SIZE:
+            sample = sample[np.random.default_rng(self.seed).choice(len(sample), PQ_TRAIN_SIZE, replace=False)]
+        subvectors = self.pq_subvectors
+        width = sample.shape[1] // subvectors
+        return np.stack([
+            kmeans(sample[:, part * width:(part + 1) * width], PQ_CENTROIDS, self.iterations, spherical=False,
+                   seed=self.seed + part)
+            for part in range(subvectors)
+        ])
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        subvectors, _, width = self.codebooks.shape
+        codes = np.empty((len(vectors), subvectors), dtype=np.uint8)
+        for part in range(subvectors):
+            codes[:, part] = assign(vectors[:, part * width:(part + 1) * width], self.codebooks[part], spherical=False)
+        return codes
+
+    def save(self, path: str) -> None:
+        """Write the index to a directory of .npy files plus params.json."""
+        os.makedirs(path, exist_ok=True)
+        arrays = {"centroids": self.centroids, "offsets": self.offsets, "rows": self.rows,
+                  "vectors": self.vectors, "codes": self.codes, "codebooks": self.codebooks}
+        for name, array in arrays.items():
+            file_path = os.path.join(path, f"{name}.npy")
+            if array is not None:
+                np.save(file_path, np.ascontiguousarray(array))
+            elif os.path.exists(file_path):
+                # Left over from a build with the other storage mode
+                os.remove(file_path)
+        with open(os.path.join(path, "params.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_FORMAT_VERSION, "n_lists": self.n_lists, "n_probe": self.n_probe,
+                       "pq_subvectors": self.pq_subvectors, "size": len(self)}, f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IVFIndex"]:
+        """
+        Open a saved index with memory-mapped arrays.
+
+        Returns:
+            The index, or None if the directory holds no index of the current format
+        """
+        params_path = os.path.join(path, "params.json")
+        if not os.path.exists(params_path):
+            return None
+        with open(params_path, "r", encoding="utf-8") as f:
+            params = json.load(f)
+        if params.get("version") != INDEX_FORMAT_VERSION:
+            return None
+        index = cls(n_lists=params["n_lists"], n_probe=params["n_probe"], pq_subvectors=params["pq_subvectors"])
+        for name in ("centroids", "offsets", "rows", "vectors", "codes", "codebooks"):
+            file_path = os.path.join(path, f"{name}.npy")
+            if os.path.exists(file_path):
+                setattr(index, name, np.load(file_path, mmap_mode="r"))
+        return index
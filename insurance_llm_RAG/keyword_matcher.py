@@ -0,0 +1,95 @@
+"""
+Keyword Matcher Module
+
+This module provides a precompiled Aho-Corasick automaton that finds every
+knowledge-base title mentioned in a chat message with a single pass over the
+message, independent of how many titles are loaded.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """
+    A case-insensitive multi-keyword matcher that only reports whole-word matches.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Build the automaton for the given keywords.
+
+        Args:
+            keywords: The keywords to look for. Empty keywords are ignored.
+        """
+        # Trie transitions, failure links and (keyword, length) outputs per state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, int]]] = [[]]
+        self.keywords: List[str] = []
+
+        for keyword in keywords:
+            if keyword:
+                self._add(keyword)
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _add(self, keyword: str) -> None:
+        """Insert a keyword into the trie."""
+        pattern = keyword.lower()
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((keyword, len(pattern)))
+        self.keywords.append(keyword)
+
+    def _build_failure_links(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[str]:
+        """
+        Find every keyword that occurs in the text as a whole word.
+
+        Args:
+            text: The text to scan
+
+        Returns:
+            The matching keywords, deduplicated, in order of first occurrence
+        """
+        lowered = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Dict[str, None] = {}
+        state = 0
+        for end, char in enumerate(lowered, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, length in output[state]:
+                if keyword in found:
+                    continue
+                start = end - length
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                if end < len(lowered) and lowered[end].isalnum():
+                    continue
+                found[keyword] = None
+        return list(found)
@@ -0,0 +1,255 @@
+"""
+Knowledge Base Module
+
+This module loads the markdown knowledge base used by the DIY RAG system,
+splits every file into heading-delimited sections and indexes them so that
+only the sections relevant to a question are retrieved. A watcher can keep the
+index in sync with the files on disk while the server is running.
+"""
+
+import glob
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from bm25_index import BM25Index, tokenize
+from entity_index import EntityIndex
+from keyword_matcher import KeywordMatcher
+from markdown_sections import Section, split_sections
+
+
+# Words shorter than this are never fuzzy-matched against names, to avoid spurious hits
+MIN_FUZZY_WORD_LENGTH = 4
+
+
+def document_aliases(path: str) -> List[str]:
+    """
+    Return the names by which a question can refer to a document.
+
+    Employees are known by full name, first name, surname and first name plus surname;
+    products by name. Other documents have no aliases.
+    """
+    doc_type = os.path.basename(os.path.dirname(path))
+    title = os.path.basename(path)[:-3]
+    if doc_type == "employees":
+        names = title.split(" ")
+        return list(dict.fromkeys([title, names[0], names[-1], f"{names[0]} {names[-1]}"]))
+    if doc_type == "products":
+        return [title]
+    return []
+
+
+class KnowledgeBase:
+    """
+    An indexed collection of markdown documents, retrievable by section.
+    """
+
+    def __init__(self, documents: Dict[str, str], previous: Optional["KnowledgeBase"] = None):
+        """
+        Split and index a set of documents.
+
+        Args:
+            documents: Mapping of file path to markdown source
+            previous: An earlier knowledge base whose parsed sections are reused
+                for documents whose text has not changed
+        """
+        self.documents = documents
+        self.sections: Dict[str, Section] = {}
+        self.index = BM25Index()
+        self._parsed: Dict[str, List[Tuple[str, Section, List[str]]]] = {}
+        aliases: Dict[str, List[str]] = {}
+
+        for path, text in documents.items():
+            if previous is not None and previous.documents.get(path) == text:
+                parsed = previous._parsed[path]
+            else:
+                parsed = self._parse(path, text)
+            self._parsed[path] = parsed
+            for section_id, section, tokens in parsed:
+                self.sections[section_id] = section
+                self.index.add_tokens(section_id, tokens)
+            for alias in document_aliases(path):
+                aliases.setdefault(alias, []).append(path)
+        self.index.build()
+
+        # Exact names are found in one pass by the matcher; the entity index catches misspellings
+        self.aliases = aliases
+        self.matcher = KeywordMatcher(aliases.keys())
+        self.entities = EntityIndex()
+        for alias, paths in aliases.items():
+            for path in paths:
+                self.entities.add(alias, path)
+
+    @classmethod
+    def from_directory(cls, root: str) -> "KnowledgeBase":
+        """
+        Load every markdown file under a directory.
+
+        Args:
+            root: The knowledge-base directory
+
+        Returns:
+            The indexed knowledge base
+        """
+        return cls({path: _read(path) for path in _list_markdown(root)})
+
+    @staticmethod
+    def _parse(path: str, text: str) -> List[Tuple[str, Section, List[str]]]:
+        """Split a document into (section_id, section, tokens) triples."""
+        title = os.path.basename(path)[:-3]
+        return [
+            (f"{path}#{number}", section, tokenize(f"{section.title}\n{section.heading}\n{section.text}"))
+            for number, section in enumerate(split_sections(text, title))
+        ]
+
+    def named_documents(self, query: str) -> List[str]:
+        """
+        Find the documents a query refers to by name, tolerating misspellings.
+
+        Args:
+            query: The user's question
+
+        Returns:
+            Paths of the named documents; an ambiguous name such as a shared first name returns all of them
+        """
+        exact = self.matcher.find_all(query)
+        # "Jordan Bishop" settles which Jordan is meant, so drop the bare first name and surname
+        full_names = [alias.lower().split() for alias in exact if " " in alias]
+        exact = [alias for alias in exact if not any(alias.lower() in words for words in full_names)]
+        paths = {path: None for alias in exact for path in self.aliases[alias]}
+        matched_words = set(tokenize(" ".join(exact)))
+        for word in tokenize(query):
+            # Words the corpus already uses ("career") are not misspelled names ("Carter")
+            if len(word) < MIN_FUZZY_WORD_LENGTH or word in matched_words or word in self.index.vocabulary:
+                continue
+            matches = self.entities.lookup(word)
+            for path, _, similarity in matches:
+                if similarity == matches[0][2]:
+                    paths.setdefault(path, None)
+        return list(paths)
+
+    def search(self, query: str, k: int = 3, sections_per_title: int = 2) -> List[Tuple[Section, float]]:
+        """
+        Retrieve the sections most relevant to a query.
+
+        Documents named in the query, even misspelled, contribute their best-matching
+        sections (or their leading sections if none match) ahead of everything else,
+        followed by the top BM25 sections from the whole corpus.
+
+        Args:
+            query: The user's question
+            k: Number of sections to take from the whole corpus
+            sections_per_title: Number of sections to take from each named document
+
+        Returns:
+            (section, score) pairs without duplicates; named-document sections score infinity
+        """
+        results: Dict[str, float] = {}
+        for path in self.named_documents(query):
+            prefix = path + "#"
+            # A misspelled name matches no section, so rank with the document's title added to the query
+            title = os.path.basename(path)[:-3]
+            named = self.index.search(f"{query} {title}", sections_per_title, doc_filter=lambda doc_id: doc_id.startswith(prefix))
+            section_ids = [section_id for section_id, _ in named]
+            if not section_ids:
+                section_ids = [section_id for section_id, _, _ in self._parsed[path][:sections_per_title]]
+            for section_id in section_ids:
+                results[section_id] = float("inf")
+        for section_id, score in self.index.search(query, k):
+            results.setdefault(section_id, score)
+        return [(self.sections[section_id], score) for section_id, score in results.items()]
+
+
+class KnowledgeBaseWatcher:
+    """
+    Keeps a KnowledgeBase in sync with a directory by polling file mtimes and sizes.
+
+    Only added or modified files are re-read and re-split. The rebuilt knowledge base
+    is published by a single attribute assignment, so readers that take `current`
+    once per request always see a complete, consistent snapshot while a reload runs.
+    """
+
+    def __init__(self, root: str, interval: float = 2.0):
+        """
+        Load the knowledge base and prepare (but don't start) the watcher.
+
+        Args:
+            root: The knowledge-base directory
+            interval: Seconds between polls
+        """
+        self.root = root
+        self.interval = interval
+        self._stats = _stat_markdown(root)
+        self.current = KnowledgeBase({path: _read(path) for path in self._stats})
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> bool:
+        """
+        Check the directory once and reload changed files.
+
+        Returns:
+            True if a new knowledge base was swapped in
+        """
+        stats = _stat_markdown(self.root)
+        changed = [path for path, stat in stats.items() if self._stats.get(path) != stat]
+        removed = self._stats.keys() - stats.keys()
+        if not changed and not removed:
+            return False
+
+        documents = {path: text for path, text in self.current.documents.items() if path not in removed}
+        for path in changed:
+            try:
+                documents[path] = _read(path)
+            except FileNotFoundError:
+                # Deleted between the scan and the read; the next poll will notice
+                documents.pop(path, None)
+                stats.pop(path)
+        self.current = KnowledgeBase(documents, previous=self.current)
+        self._stats = stats
+        print(f"Knowledge base reloaded: {len(changed)} changed, {len(removed)} removed, {len(self.current.sections)} sections")
+        return True
+
+    def start(self) -> "KnowledgeBaseWatcher":
+        """Start polling on a daemon thread and return the watcher."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="knowledge-base-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the polling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # Keep serving the last good snapshot; try again on the next poll
+                print(f"Knowledge base reload failed: {e}")
+
+
+def _list_markdown(root: str) -> List[str]:
+    """Return the paths of all markdown files under root."""
+    return glob.glob(os.path.join(root, "**", "*.md"), recursive=True)
+
+
+def _stat_markdown(root: str) -> Dict[str, Tuple[int, int]]:
+    """Return (mtime_ns, size) for every markdown file under root."""
+    stats = {}
+    for path in _list_markdown(root):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stats[path] = (stat.st_mtime_ns, stat.st_size)
+    return stats
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
@@ -0,0 +1,140 @@
+"""
+Local Embeddings Module
+
+This module provides embedding backends that run without a network connection,
+plus a factory that selects the backend by name:
+
+- "openai": hosted OpenAIEmbeddings (the default)
+- "local": a small sentence-transformers model run on CPU with batched inference
+  and a configurable number of threads (requires `pip install sentence-transformers`)
+- "hashing": a dependency-free hashed TF-IDF style embedder projected to a fixed
+  dimension, fast and deterministic, intended for tests and air-gapped smoke runs
+"""
+
+import hashlib
+import math
+import os
+import re
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_BACKENDS = ("openai", "local", "hashing")
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeds text by hashing unigrams and bigrams into a fixed number of signed buckets.
+
+    Term counts are damped with 1 + log(tf) and each term is weighted by a length-based
+    proxy for rarity, so no corpus statistics are needed and every process produces the
+    same vectors. Vectors are L2-normalized, so cosine similarity is a dot product.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        """
+        Initialize the embedder.
+
+        Args:
+            dimensions: Length of the output vectors
+        """
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = WORD_PATTERN.findall(text.lower())
+            terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                digest = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+                bucket = digest % self.dimensions
+                sign = 1.0 if (digest >> 63) & 1 else -1.0
+                # Longer terms (and bigrams) are rarer on average; weight them up a little
+                weight = (1 + math.log(count)) * math.log(2 + len(term))
+                vectors[row, bucket] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Embeds text with a sentence-transformers model on the local CPU.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_LOCAL_MODEL, batch_size: int = 64, num_threads: Optional[int] = None,
+                 device: str = "cpu"):
+        """
+        Load the model.
+
+        Args:
+            model_name: Hugging Face model identifier or local path
+            batch_size: Texts per forward pass
+            num_threads: Torch intra-op threads; None keeps torch's default (all cores)
+            device: Torch device to run on
+
+        Raises:
+            ImportError: If sentence-transformers is not installed
+        """
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("The local embedding backend needs `pip install sentence-transformers`.") from e
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = model_name
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_name, device=device)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                  convert_to_numpy=True, show_progress_bar=False).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def make_embeddings(backend: str = "openai") -> Embeddings:
+    """
+    Create the embeddings for a backend name.
+
+    Settings are read from the environment: LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_THREADS,
+    LOCAL_EMBEDDING_BATCH_SIZE and HASHING_EMBEDDING_DIMENSIONS.
+
+    Args:
+        backend: One of EMBEDDING_BACKENDS
+
+    Returns:
+        The embeddings object
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings()
+    if backend == "local":
+        threads = os.getenv("LOCAL_EMBEDDING_THREADS")
+        return SentenceTransformerEmbeddings(
+            model_name=os.getenv("LOCAL_EMBEDDING_MODEL", DEFAULT_LOCAL_MODEL),
+            batch_size=int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64")),
+            num_threads=int(threads) if threads else None,
+        )
+    if backend == "hashing":
+        return HashingEmbeddings(dimensions=int(os.getenv("HASHING_EMBEDDING_DIMENSIONS", "1024")))
+    raise ValueError(f"Unknown embeddings backend {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}")
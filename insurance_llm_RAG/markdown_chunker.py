@@ -0,0 +1,246 @@
+"""
+Markdown Chunker Module
+
+This module splits knowledge-base documents into chunks for embedding along
+their markdown structure, sized in model tokens instead of characters. Each
+document is split at its headings (markdown_sections); consecutive sections
+that fit together are packed into one chunk, and a section too long for one
+chunk is cut between paragraphs and list items (a list item keeps its nested
+items). Overlap is only added where a section is cut, and every chunk that
+does not start at the top of its document begins with its heading path, so it
+can be understood on its own. Documents are split in parallel on a process pool.
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, NamedTuple, Tuple
+
+from langchain_core.documents import Document
+
+from markdown_sections import HEADING_PATTERN, split_sections
+from tokens import DEFAULT_MODEL, count_tokens
+
+LIST_ITEM_PATTERN = re.compile(r"^([-*+]|\d+[.)])\s+")
+
+
+class Chunk(NamedTuple):
+    """A piece of a document, ready to embed."""
+    text: str
+    heading: str
+    tokens: int
+    cut: bool
+
+
+def split_blocks(text: str) -> List[Tuple[str, bool]]:
+    """
+    Split markdown into the units a chunk may be cut between.
+
+    A unit is a paragraph, a top-level list item with everything indented under it,
+    or a fenced code block. Heading lines stay attached to the unit that follows them.
+
+    Args:
+        text: Markdown source
+
+    Returns:
+        (block, preceded by a blank line) pairs in document order
+    """
+    blocks: List[Tuple[str, bool]] = []
+    lines: List[str] = []
+    blank_before = False
+    pending_blank = False
+    in_code_block = False
+
+    def flush():
+        nonlocal lines
+        if lines and not all(HEADING_PATTERN.match(line) for line in lines):
+            blocks.append(("\n".join(lines), blank_before))
+            lines = []
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if not in_code_block:
+                flush()
+            in_code_block = not in_code_block
+        elif not in_code_block:
+            if not stripped:
+                pending_blank = True
+                continue
+            if not line[0].isspace() and (LIST_ITEM_PATTERN.match(line) or pending_blank):
+                flush()
+            elif HEADING_PATTERN.match(line):
+                flush()
+        if not lines:
+            blank_before = pending_blank
+        elif pending_blank:
+            lines.append("")
+        pending_blank = False
+        lines.append(line)
+    if lines:
+        blocks.append(("\n".join(lines), blank_before))
+    return blocks
+
+
+def chunk_markdown(text: str, title: str, max_tokens: int = 400, overlap_tokens: int = 40,
+                   model: str = DEFAULT_MODEL) -> List[Chunk]:
+    """
+    Split one markdown document into token-sized chunks along its structure.
+
+    Args:
+        text: The markdown source
+        title: Title of the document, used in heading paths
+        max_tokens: Largest chunk, in tokens
+        overlap_tokens: Tokens repeated from the end of one piece of a cut section at the
+            start of the next
+        model: Model whose tokenizer sizes the chunks
+
+    Returns:
+        The chunks in document order
+    """
+    chunks: List[Chunk] = []
+    # Whole sections waiting to be packed together: (text, heading)
+    packed: List[Tuple[str, str]] = []
+
+    def label(heading: str) -> str:
+        return f"[{heading or title}]"
+
+    def render(sections: List[Tuple[str, str]]) -> str:
+        body = "\n\n".join(text for text, _ in sections)
+        # The first chunk starts with the document's own headings
+        return f"{label(sections[0][1])}\n{body}" if chunks else body
+
+    def emit_packed():
+        if packed:
+            body = render(packed)
+            chunks.append(Chunk(body, packed[0][1], count_tokens(body, model), False))
+            packed.clear()
+
+    for section in split_sections(text, title):
+        header_tokens = count_tokens(label(section.heading), model) + 1
+        if count_tokens(section.text, model) + header_tokens <= max_tokens:
+            if packed and count_tokens(render(packed + [(section.text, section.heading)]), model) > max_tokens:
+                emit_packed()
+            packed.append((section.text, section.heading))
+            continue
+        emit_packed()
+        for piece in _cut(section.text, max_tokens - header_tokens, overlap_tokens, model):
+            body = f"{label(section.heading)}\n{piece}"
+            chunks.append(Chunk(body, section.heading, count_tokens(body, model), True))
+    emit_packed()
+    return chunks
+
+
+def _cut(text: str, budget: int, overlap_tokens: int, model: str) -> List[str]:
+    """Cut text between blocks into pieces of at most budget tokens, with overlap between pieces."""
+    blocks = []
+    for block, blank_before in split_blocks(text):
+        if count_tokens(block, model) <= budget:
+            blocks.append((block, blank_before, count_tokens(block, model)))
+        else:
+            blocks.extend((part, True, count_tokens(part, model)) for part in _split_oversized(block, budget, model))
+
+    pieces: List[str] = []
+    current: List[Tuple[str, bool, int]] = []
+    carried = 0
+    for block in blocks:
+        if current and len(current) > carried and count_tokens(_join(current + [block]), model) > budget:
+            pieces.append(_join(current))
+            # Start the next piece with the trailing blocks that fit in the overlap
+            overlap: List[Tuple[str, bool, int]] = []
+            for previous in reversed(current):
+                if sum(size for _, _, size in overlap) + previous[2] > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+            while overlap and count_tokens(_join(overlap + [block]), model) > budget:
+                overlap.pop(0)
+            current, carried = overlap, len(overlap)
+        current.append(block)
+    if current:
+        pieces.append(_join(current))
+    return pieces
+
+
+def _split_oversized(block: str, budget: int, model: str) -> List[str]:
+    """Split a single block larger than the budget at line, then word boundaries."""
+    parts = _pack(block.splitlines(), "\n", budget, model)
+    # A single line can still be too long; split those at words
+    return [piece for part in parts
+            for piece in (_pack(part.split(" "), " ", budget, model) if count_tokens(part, model) > budget else [part])]
+
+
+def _pack(units: List[str], separator: str, budget: int, model: str) -> List[str]:
+    """Join consecutive units into parts of at most budget tokens where possible."""
+    parts: List[str] = []
+    current: List[str] = []
+    for unit in units:
+        if current and count_tokens(separator.join(current + [unit]), model) > budget:
+            # Heading lines move on with the text that follows them instead of ending a part
+            headings = 0
+            while headings < len(current) and (not current[-1 - headings].strip()
+                                               or HEADING_PATTERN.match(current[-1 - headings])):
+                headings += 1
+            if headings < len(current):
+                parts.append(separator.join(current[:len(current) - headings]))
+                current = current[len(current) - headings:]
+        current.append(unit)
+    if current:
+        parts.append(separator.join(current))
+    return parts
+
+
+def _join(blocks: List[Tuple[str, bool, int]]) -> str:
+    """Join blocks, restoring the blank lines that separated them."""
+    text = ""
+    for block, blank_before, _ in blocks:
+        text += ("\n\n" if blank_before else "\n") + block if text else block
+    return text
+
+
+class MarkdownChunker:
+    """
+    Splits LangChain documents into structure-aware chunks, in parallel for large batches.
+    """
+
+    def __init__(self, max_tokens: int = 400, overlap_tokens: int = 40, model: str = DEFAULT_MODEL,
+                 workers: int = 0, parallel_threshold: int = 64):
+        """
+        Initialize the chunker.
+
+        Args:
+            max_tokens: Largest chunk, in tokens
+            overlap_tokens: Overlap between the pieces of a cut section, in tokens
+            model: Model whose tokenizer sizes the chunks
+            workers: Worker processes; 0 uses one per CPU
+            parallel_threshold: Fewer documents than this are split in-process, since
+                starting workers costs more than splitting a small knowledge base
+        """
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.model = model
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Chunk documents, keeping each document's metadata and adding the chunk's heading path.
+
+        Args:
+            documents: Markdown documents, e.g. from DirectoryLoader; the title is taken from
+                the source file name
+
+        Returns:
+            The chunks of all documents, in order
+        """
+        split = partial(chunk_markdown, max_tokens=self.max_tokens, overlap_tokens=self.overlap_tokens,
+                        model=self.model)
+        texts = [document.page_content for document in documents]
+        titles = [os.path.splitext(os.path.basename(document.metadata.get("source", "")))[0] for document in documents]
+        if self.workers > 1 and len(documents) >= self.parallel_threshold:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                chunked = list(pool.map(split, texts, titles, chunksize=max(1, len(documents) // (self.workers * 4))))
+        else:
+            chunked = [split(text, title) for text, title in zip(texts, titles)]
+        return [Document(page_content=chunk.text, metadata={**document.metadata, "heading": chunk.heading})
+                for document, chunks in zip(documents, chunked) for chunk in chunks]
@@ -0,0 +1,74 @@
+"""
+Markdown Sections Module
+
+This module splits markdown documents into heading-delimited sections so that
+retrieval can return the part of a document that answers a question instead of
+the whole file.
+"""
+
+import re
+from typing import List, NamedTuple
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+
+
+class Section(NamedTuple):
+    """A heading-delimited slice of a markdown document."""
+    title: str
+    heading: str
+    text: str
+
+    def render(self) -> str:
+        """Format the section for a prompt, labelled with its parent document."""
+        if self.heading.startswith(self.title):
+            label = self.heading
+        elif self.heading:
+            label = f"{self.title} > {self.heading}"
+        else:
+            label = self.title
+        return f"[{label}]\n{self.text}"
+
+
+def split_sections(text: str, title: str) -> List[Section]:
+    """
+    Split a markdown document at its headings.
+
+    Headings that are immediately followed by another heading are folded into the
+    next section, and the heading path (e.g. "Alex Chen > Compensation History")
+    is recorded so each section can be understood on its own.
+
+    Args:
+        text: The markdown source
+        title: Title of the parent document
+
+    Returns:
+        The non-empty sections in document order
+    """
+    sections = []
+    heading_stack: List[tuple] = []
+    lines: List[str] = []
+    has_body = False
+    in_code_block = False
+
+    def flush():
+        if has_body:
+            heading = " > ".join(name for _, name in heading_stack)
+            sections.append(Section(title, heading, "\n".join(lines).strip()))
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code_block = not in_code_block
+        match = None if in_code_block else HEADING_PATTERN.match(line)
+        if match:
+            if has_body:
+                flush()
+                lines, has_body = [], False
+            level = len(match.group(1))
+            while heading_stack and heading_stack[-1][0] >= level:
+                heading_stack.pop()
+            heading_stack.append((level, match.group(2)))
+        elif line.strip():
+            has_body = True
+        lines.append(line)
+    flush()
+    return sections
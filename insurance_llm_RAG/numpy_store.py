@@ -0,0 +1,392 @@
+"""
+NumPy Vector Store Module
+
+This module provides a LangChain vector store that keeps every chunk embedding
+in one contiguous matrix and answers queries with an exact, vectorized
+dot-product scan. For a knowledge base of our size this is faster and lighter
+than a Chroma client, and it needs nothing beyond NumPy.
+
+Vectors are L2-normalized (so the dot product is the cosine similarity) and can
+be stored as float32, float16 or int8 with a per-vector scale. A saved store is
+opened with a memory map, so start-up is instant and only the pages a search
+touches are read into memory. For large corpora an IVFIndex can be attached to
+answer unfiltered queries approximately in sub-linear time.
+"""
+
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from ivf_index import IVFIndex
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+STORE_FORMAT_VERSION = 1
+
+# Rows scored per matrix product; keeps the float32 copy of a float16/int8 block in cache
+BLOCK_ROWS = 1024
+
+# Candidates per result fetched from a PQ index and re-scored against the stored vectors
+PQ_REFINE = 10
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return the rows of a float32 matrix scaled to unit length."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def append_rows(buffer: Optional[np.ndarray], used: int, rows: np.ndarray) -> np.ndarray:
+    """
+    Write rows after the first `used` rows of a buffer, growing it geometrically when full.
+
+    Args:
+        buffer: The buffer, or None; a read-only (memory-mapped) buffer is copied once
+        used: Number of rows of the buffer in use
+        rows: The rows to append
+
+    Returns:
+        The buffer holding the rows, possibly a new, larger one
+    """
+    needed = used + len(rows)
+    if buffer is None or needed > len(buffer) or not buffer.flags.writeable:
+        grown = np.empty((max(needed, 2 * used),) + rows.shape[1:], dtype=rows.dtype)
+        if used:
+            grown[:used] = buffer[:used]
+        buffer = grown
+    buffer[used:needed] = rows
+    return buffer
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convert normalized float32 vectors to the storage dtype.
+
+    Args:
+        vectors: Matrix of unit vectors
+        dtype: One of STORAGE_DTYPES
+
+    Returns:
+        The stored matrix, and for int8 the per-row scales that map it back to float
+    """
+    if dtype == "int8":
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+        matrix = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return matrix, scales.astype(np.float32)
+    return vectors.astype(dtype), None
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact-search vector store over a single, optionally memory-mapped, matrix.
+    """
+
+    def __init__(self, embedding: Optional[Embeddings] = None, path: Optional[str] = None, dtype: str = "float32"):
+        """
+        Open a store, loading it from disk if `path` holds a saved store.
+
+        Args:
+            embedding: Embeddings for queries and added texts; only search_vectors works without one
+            path: Directory the store is saved to and loaded from
+            dtype: Storage dtype for vectors, one of STORAGE_DTYPES (a loaded store keeps its own dtype)
+
+        Raises:
+            ValueError: If the dtype is not supported, or `path` holds a store of another format version
+        """
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {', '.join(STORAGE_DTYPES)}")
+        self.embedding = embedding
+        self.path = path
+        self.dtype = dtype
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        # Spare capacity behind _matrix and _scales, so adding a batch doesn't copy the whole store
+        self._matrix_buffer: Optional[np.ndarray] = None
+        self._scales_buffer: Optional[np.ndarray] = None
+        self._positions: Dict[str, int] = {}
+        self.ann: Optional[IVFIndex] = None
+        if path and os.path.exists(os.path.join(path, "records.json")):
+            self._load(path)
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    @property
+    def dimensions(self) -> int:
+        return 0 if self._matrix is None else self._matrix.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def memory_bytes(self) -> int:
+        """Size of the vector matrix and scales (what a full scan reads)."""
+        if self._matrix is None:
+            return 0
+        return self._matrix.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+    # Writing
+
+    def build_ann(self, index: IVFIndex) -> None:
+        """
+        Build an approximate index over the current vectors and use it for unfiltered searches.
+
+        The index is dropped again by any add or delete, so rebuild it after changing the store.
+        """
+        self.ann = index.build(self._dequantize(np.arange(len(self.ids), dtype=np.int64)))
+
+    def add_vectors(self, documents: List[Document], ids: List[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Add already-embedded documents, replacing any with the same IDs.
+
+        The signature matches the writers used by ingestion.RateLimitedIngestor.
+
+        Args:
+            documents: The documents
+            ids: One ID per document
+            vectors: One embedding per document
+        """
+        if not ids:
+            return
+        self.ann = None
+        self.delete([chunk_id for chunk_id in ids if chunk_id in self._positions])
+        matrix, scales = quantize(normalize(np.asarray(vectors)), self.dtype)
+        used, added = len(self.ids), len(matrix)
+        self._matrix_buffer = append_rows(self._matrix_buffer, used, matrix)
+        self._matrix = self._matrix_buffer[:used + added]
+        if scales is not None:
+            self._scales_buffer = append_rows(self._scales_buffer, used, scales)
+            self._scales = self._scales_buffer[:used + added]
+        for chunk_id, document in zip(ids, documents):
+            self._positions[chunk_id] = len(self.ids)
+            self.ids.append(chunk_id)
+            self.texts.append(document.page_content)
+            self.metadatas.append(dict(document.metadata or {}))
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            ids = [f"{len(self.ids) + number}" for number in range(len(texts))]
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        self.add_vectors(documents, list(ids), self.embedding.embed_documents(texts))
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Remove documents by ID; unknown IDs are ignored."""
+        doomed = {self._positions[chunk_id] for chunk_id in ids or () if chunk_id in self._positions}
+        if not doomed:
+            return True
+        self.ann = None
+        keep = np.array([row for row in range(len(self.ids)) if row not in doomed], dtype=np.int64)
+        self._matrix = self._matrix_buffer = self._matrix[keep]
+        if self._scales is not None:
+            self._scales = self._scales_buffer = self._scales[keep]
+        self.ids = [self.ids[row] for row in keep]
+        self.texts = [self.texts[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self._positions = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        return True
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Write the store to a directory: vectors.npy (and scales.npy for int8), records.json and,
+        if one is built, the approximate index under ivf/.
+
+        Each file is written under a temporary name and renamed, so an interrupted save never leaves a truncated file.
+        """
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        arrays = {"vectors": self._matrix if self._matrix is not None else np.zeros((0, 0), dtype=self.dtype)}
+        if self._scales is not None:
+            arrays["scales"] = self._scales
+        for name, array in arrays.items():
+            with open(os.path.join(path, f"{name}.npy.tmp"), "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+        with open(os.path.join(path, "records.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_FORMAT_VERSION, "dtype": self.dtype, "ids": self.ids,
+                       "texts": self.texts, "metadatas": self.metadatas}, f)
+        for name in arrays:
+            os.replace(os.path.join(path, f"{name}.npy.tmp"), os.path.join(path, f"{name}.npy"))
+        os.replace(os.path.join(path, "records.json.tmp"), os.path.join(path, "records.json"))
+        ann_path = os.path.join(path, "ivf")
+        if self.ann is not None:
+            self.ann.save(ann_path)
+        elif os.path.isdir(ann_path):
+            shutil.rmtree(ann_path)
+
+    def _load(self, path: str) -> None:
+        with open(os.path.join(path, "records.json"), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if records.get("version") != STORE_FORMAT_VERSION:
+            # Loading nothing would let the index manifest claim chunks the store no longer has
+            raise ValueError(f"{path} holds a vector store of format version {records.get('version')}, "
+                             f"expected {STORE_FORMAT_VERSION}; delete the directory and run build-index again")
+        self.dtype = records["dtype"]
+        self.ids, self.texts, self.metadatas = records["ids"], records["texts"], records["metadatas"]
+        self._positions = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        if self.ids:
+            self._matrix = self._matrix_buffer = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+            if self.dtype == "int8":
+                self._scales = self._scales_buffer = np.load(os.path.join(path, "scales.npy"))
+            self.ann = IVFIndex.load(os.path.join(path, "ivf"))
+
+    # Reading
+
+    def get(self, ids: Optional[List[str]] = None, limit: Optional[int] = None, offset: int = 0,
+            include: Sequence[str] = ("documents", "metadatas"), **kwargs: Any) -> Dict[str, Any]:
+        """
+        Return stored records in the same shape as Chroma's get().
+
+        Args:
+            ids: Only return these IDs (unknown IDs are skipped)
+            limit: Maximum number of records
+            offset: Records to skip
+            include: Any of "documents", "metadatas" and "embeddings"
+
+        Returns:
+            A dict with "ids" and one list per included field
+        """
+        rows = range(len(self.ids)) if ids is None else [self._positions[chunk_id] for chunk_id in ids
+                                                         if chunk_id in self._positions]
+        rows = list(rows)[offset:None if limit is None else offset + limit]
+        result: Dict[str, Any] = {"ids": [self.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [self.texts[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self.metadatas[row] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = self._dequantize(np.asarray(rows, dtype=np.int64))
+        return result
+
+    def search_vectors(self, queries: np.ndarray, k: int = 4, mask: Optional[np.ndarray] = None,
+                       exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k most similar stored vectors for each query in one pass over the matrix.
+
+        Args:
+            queries: A (dimensions,) vector or (queries, dimensions) matrix
+            k: Results per query
+            mask: Optional boolean array over stored rows; False rows are never returned
+            exact: Scan the full matrix even if an approximate index is attached
+                (masked searches always do)
+
+        Returns:
+            (rows, scores), each of shape (queries, k'), best first, where k' = min(k, eligible rows)
+        """
+        queries = normalize(np.atleast_2d(queries))
+        count = len(self.ids) if mask is None else int(mask.sum())
+        k = min(k, count)
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        if self.ann is not None and mask is None and not exact:
+            return self._search_ann(queries, k)
+
+        scores = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), BLOCK_ROWS):
+            block = self._matrix[start:start + BLOCK_ROWS]
+            block_scores = queries @ block.T.astype(np.float32, copy=False)
+            if self._scales is not None:
+                block_scores *= self._scales[start:start + BLOCK_ROWS]
+            scores[:, start:start + BLOCK_ROWS] = block_scores
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+
+        if k < scores.shape[1]:
+            rows = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            rows = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        top = np.take_along_axis(scores, rows, axis=1)
+        order = np.argsort(-top, axis=1)
+        return np.take_along_axis(rows, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def _search_ann(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        pq = self.ann.codes is not None
+        rows, scores = self.ann.search(queries, k * PQ_REFINE if pq else k)
+        if pq:
+            # PQ scores only rank candidates; re-score them exactly and keep the best k
+            valid = rows >= 0
+            vectors = self._dequantize(np.where(valid, rows, 0).ravel()).reshape(*rows.shape, -1)
+            scores = np.where(valid, np.einsum("qcd,qd->qc", vectors, queries), -np.inf).astype(np.float32)
+            order = np.argsort(-scores, axis=1)[:, :k]
+            rows, scores = np.take_along_axis(rows, order, axis=1), np.take_along_axis(scores, order, axis=1)
+        # Too few candidates in the probed lists: drop the padding
+        if (rows[:, k - 1] < 0).any():
+            k = int((rows >= 0).sum(axis=1).min())
+        return rows[:, :k], scores[:, :k]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        rows, scores = self.search_vectors(np.asarray(embedding), k, self._filter_mask(filter))
+        return [(self._document(row), float(score)) for row, score in zip(rows[0], scores[0])]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def batch_similarity_search(self, queries: List[str], k: int = 4,
+                                filter: Optional[dict] = None) -> List[List[Document]]:
+        """
+        Answer several queries with one embedding call and one pass over the matrix.
+
+        Args:
+            queries: The query texts
+            k: Results per query
+            filter: Optional metadata equality filter, e.g. {"doc_type": "contracts"}
+
+        Returns:
+            One list of documents per query, best first
+        """
+        if not queries:
+            return []
+        vectors = np.asarray(self.embedding.embed_documents(queries))
+        rows, _ = self.search_vectors(vectors, k, self._filter_mask(filter))
+        return [[self._document(row) for row in query_rows] for query_rows in rows]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] mapped to [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def _filter_mask(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        if not filter:
+            return None
+        return np.array([all(metadata.get(key) == value for key, value in filter.items())
+                         for metadata in self.metadatas], dtype=bool)
+
+    def _document(self, row: int) -> Document:
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=self.metadatas[row])
+
+    def _dequantize(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self._matrix[rows], dtype=np.float32) if len(rows) else np.zeros((0, self.dimensions), np.float32)
+        if self._scales is not None:
+            vectors *= self._scales[rows][:, None]
+        return vectors
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, path: Optional[str] = None, dtype: str = "float32",
+                   **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding, path=None, dtype=dtype)
+        store.path = path
+        store.add_texts(texts, metadatas, ids)
+        if path:
+            store.save()
+        return store
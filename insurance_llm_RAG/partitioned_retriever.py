@@ -0,0 +1,143 @@
+"""
+Partitioned Retriever Module
+
+This module splits the vector store into one shard per doc_type (employees,
+products, contracts, company) and lets a QueryRouter pick which shards a
+question searches. Each shard is an in-memory NumpyVectorStore with its own
+HybridIndex, so a routed question only scores the chunks of its partitions.
+When more than one partition is selected, they are searched in parallel; the
+dense and BM25 candidates of all of them are merged by score and the two
+merged rankings are fused with reciprocal rank fusion, as for a single index.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from hybrid_retriever import RRF_K, HybridIndex, reciprocal_rank_fusion
+from numpy_store import NumpyVectorStore
+from query_router import QueryRouter
+
+
+class PartitionedIndex:
+    """
+    Per-doc_type hybrid indexes over the chunks of a vector store, searched through a router.
+    """
+
+    def __init__(self, vectorstore, embeddings: Embeddings, router: QueryRouter, candidates: int = 20,
+                 rrf_k: int = RRF_K):
+        """
+        Shard every chunk currently in the vector store by its doc_type metadata.
+
+        Args:
+            vectorstore: A LangChain vector store with Chroma-style get() (Chroma or NumpyVectorStore)
+            embeddings: Embeddings for queries; must be the model the store was built with
+            router: Chooses the partitions for each question
+            candidates: Results taken from each search of each partition before fusion
+            rrf_k: Rank offset for reciprocal rank fusion
+        """
+        self.embeddings = embeddings
+        self.router = router
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+        records = vectorstore.get(include=["documents", "metadatas", "embeddings"])
+        grouped: Dict[str, tuple] = {}
+        for doc_id, text, metadata, vector in zip(records["ids"], records["documents"], records["metadatas"],
+                                                  records["embeddings"]):
+            metadata = metadata or {}
+            documents, ids, vectors = grouped.setdefault(metadata.get("doc_type", ""), ([], [], []))
+            documents.append(Document(page_content=text, metadata=metadata))
+            ids.append(doc_id)
+            vectors.append(vector)
+
+        self.partitions: Dict[str, HybridIndex] = {}
+        for doc_type, (documents, ids, vectors) in grouped.items():
+            shard = NumpyVectorStore(embeddings)
+            shard.add_vectors(documents, ids, vectors)
+            self.partitions[doc_type] = HybridIndex(shard, candidates=candidates, rrf_k=rrf_k)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.partitions)), thread_name_prefix="partition")
+
+        self.searches = 0
+        self.chunks_searched = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def route(self, query: str) -> List[str]:
+        """The partitions a query will search; unknown routes fall back to every partition."""
+        selected = [doc_type for doc_type in self.router.route(query) if doc_type in self.partitions]
+        return selected or sorted(self.partitions)
+
+    def search(self, query: str, k: int = 8) -> List[Document]:
+        """
+        Return the k best chunks from the partitions the router selects.
+
+        Args:
+            query: The search query
+            k: Number of chunks to return
+
+        Returns:
+            The chunks, best first
+        """
+        selected = self.route(query)
+        # Embed once and reuse the vector in every partition
+        query_vector = self.embeddings.embed_query(query)
+        if len(selected) == 1:
+            results = [self._search_partition(selected[0], query, query_vector)]
+        else:
+            results = list(self._pool.map(lambda doc_type: self._search_partition(doc_type, query, query_vector), selected))
+        # Cosine similarities are comparable across shards, and BM25 scores closely enough
+        dense = sorted((hit for partition_dense, _ in results for hit in partition_dense), key=lambda hit: -hit[1])
+        keyword = sorted((hit for _, partition_keyword in results for hit in partition_keyword), key=lambda hit: -hit[1])
+        ranked = reciprocal_rank_fusion([[doc_id for doc_id, _ in dense[:self.candidates]],
+                                         [doc_id for doc_id, _ in keyword[:self.candidates]]], self.rrf_k)
+
+        with self._lock:
+            self.searches += 1
+            self.chunks_searched += sum(len(self.partitions[doc_type]) for doc_type in selected)
+        return [self._document(doc_id, selected) for doc_id, _ in ranked[:k]]
+
+    @property
+    def search_fraction(self) -> float:
+        """Average share of all chunks each search has scored so far."""
+        total = len(self) * self.searches
+        return self.chunks_searched / total if total else 0.0
+
+    def summary(self) -> str:
+        """A one-line report of routing effectiveness."""
+        return (f"Partitioned retrieval: {self.searches} searches over {len(self.partitions)} partitions, "
+                f"{self.search_fraction:.0%} of chunks scored per search on average")
+
+    def _search_partition(self, doc_type: str, query: str,
+                          query_vector: List[float]) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+        """Return the scored dense and BM25 candidates of one partition."""
+        partition = self.partitions[doc_type]
+        dense = partition.vectorstore.similarity_search_with_score_by_vector(query_vector, k=self.candidates)
+        keyword = partition.bm25.search(query, self.candidates)
+        return [(document.id, score) for document, score in dense], keyword
+
+    def _document(self, doc_id: str, selected: List[str]) -> Document:
+        for doc_type in selected:
+            document = self.partitions[doc_type].documents.get(doc_id)
+            if document is not None:
+                return document
+        raise KeyError(doc_id)
+
+
+class PartitionedRetriever(BaseRetriever):
+    """
+    LangChain retriever over a PartitionedIndex, usable anywhere `vectorstore.as_retriever()` is.
+    """
+
+    index: PartitionedIndex
+    k: int = 8
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.index.search(query, self.k)
@@ -0,0 +1,103 @@
+"""
+Query Router Module
+
+This module decides which doc_type partitions of the knowledge base a question
+needs, so retrieval only searches those. Routing is rule-based and runs in one
+Aho-Corasick pass (KeywordMatcher) over the question: names taken from the
+knowledge-base file titles (employees, products, contract clients) and a short
+list of cue words per doc_type each vote for their partition. A question that
+matches nothing is routed to every partition.
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from keyword_matcher import KeywordMatcher
+from knowledge_base import document_aliases
+
+CONTRACT_TITLE_PATTERN = re.compile(r"^Contract with (?P<client>.+?) for (?P<product>.+)$")
+
+# Words that point at a doc_type even when no name is mentioned
+CUE_WORDS: Dict[str, List[str]] = {
+    "employees": [
+        "employee", "employees", "staff", "colleague", "who", "hired", "salary", "compensation", "bonus",
+        "promotion", "promoted", "performance", "rating", "review", "career", "role", "title", "manager",
+        "engineer", "ceo", "cto", "cfo", "award", "awards", "iioty", "born", "lives", "hobbies",
+    ],
+    "products": [
+        "product", "products", "feature", "features", "pricing", "price", "plan", "plans", "tier", "tiers",
+        "roadmap", "platform", "integration", "api", "module",
+    ],
+    "contracts": [
+        "contract", "contracts", "client", "clients", "customer", "customers", "agreement", "signed", "renewal",
+        "term", "terms", "termination", "sla", "deal", "license", "licensed",
+    ],
+    "company": [
+        "insurellm", "company", "founded", "founder", "mission", "vision", "values", "headquarters", "office",
+        "offices", "history", "careers", "culture", "benefits", "job", "jobs", "hiring", "revenue",
+    ],
+}
+
+
+class QueryRouter:
+    """
+    Maps a question to the doc_type partitions worth searching.
+    """
+
+    def __init__(self, names: Dict[str, Iterable[str]], cues: Optional[Dict[str, List[str]]] = None):
+        """
+        Build the matcher.
+
+        Args:
+            names: Entity names per doc_type (e.g. {"employees": ["Alex Chen", "Chen", ...]})
+            cues: Cue words per doc_type; defaults to CUE_WORDS
+        """
+        self.doc_types: List[str] = sorted(set(names) | set(cues or CUE_WORDS))
+        self.names: Dict[str, List[str]] = {doc_type: list(aliases) for doc_type, aliases in names.items()}
+        self._routes: Dict[str, Set[str]] = {}
+        for source in (cues or CUE_WORDS, names):
+            for doc_type, keywords in source.items():
+                for keyword in keywords:
+                    self._routes.setdefault(keyword.lower(), set()).add(doc_type)
+        self.matcher = KeywordMatcher(self._routes)
+
+    @classmethod
+    def from_directory(cls, root: str) -> "QueryRouter":
+        """
+        Build a router from a knowledge base laid out as root/<doc_type>/<title>.md.
+
+        Employee and product titles route to their own doc_type; contract titles also
+        contribute the client's name.
+        """
+        names: Dict[str, List[str]] = {}
+        for folder in sorted(os.listdir(root)):
+            directory = os.path.join(root, folder)
+            if not os.path.isdir(directory):
+                continue
+            aliases = names.setdefault(folder, [])
+            for file_name in sorted(os.listdir(directory)):
+                if not file_name.endswith(".md"):
+                    continue
+                if folder == "contracts":
+                    match = CONTRACT_TITLE_PATTERN.match(file_name[:-3])
+                    if match:
+                        aliases.append(match.group("client").rstrip("."))
+                elif folder in ("employees", "products"):
+                    aliases.extend(document_aliases(os.path.join(directory, file_name)))
+        return cls(names)
+
+    def route(self, question: str) -> List[str]:
+        """
+        Return the doc_types to search for a question.
+
+        Args:
+            question: The (standalone) question
+
+        Returns:
+            The matched doc_types in sorted order, or every doc_type if nothing matched
+        """
+        matched: Set[str] = set()
+        for keyword in self.matcher.find_all(question):
+            matched |= self._routes[keyword.lower()]
+        return sorted(matched) if matched else list(self.doc_types)
@@ -0,0 +1,149 @@
+"""
+Question Condenser Module
+
+This module decides when a follow-up question has to be rewritten into a
+standalone one by the LLM, and remembers the rewrites. ConversationalRetrievalChain
+makes that extra LLM round trip on every turn after the first; here it is
+skipped when there is no history or when a cheap heuristic judges the question
+self-contained (no pronouns or follow-up phrasing pointing back at the
+conversation, no "the ..." without a known entity to anchor it, and either long
+enough or naming a known entity). Rewrites are cached per (history hash,
+question), so a retried or repeated turn is not condensed twice, and the share
+of skipped LLM calls is counted.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from keyword_matcher import KeywordMatcher
+
+# Words that refer back to something said earlier in the conversation
+REFERRING_WORDS = frozenset([
+    "he", "she", "him", "her", "his", "hers", "they", "them", "their", "theirs", "it", "its",
+    "this", "that", "these", "those", "such", "here", "there", "one", "ones", "former", "latter", "same",
+    "above", "also", "else", "too", "another", "again", "previous", "earlier",
+])
+
+# Openings that continue the previous turn ("And for Homellm?", "What about the renewal?")
+FOLLOW_UP_OPENERS = ("and ", "but ", "or ", "so ", "then ", "what about", "how about", "tell me more", "more ",
+                     "which one")
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def is_self_contained(question: str, matcher: Optional[KeywordMatcher] = None, min_words: int = 4) -> bool:
+    """
+    Judge whether a question can be searched without the conversation before it.
+
+    Args:
+        question: The user's message
+        matcher: Finds known entity names (employees, products, clients); a question naming
+            one may be shorter than min_words
+        min_words: Questions with fewer words are treated as elliptical follow-ups
+
+    Returns:
+        True if the question has no words or phrasing that point back at earlier turns
+    """
+    text = question.strip().lower()
+    words = WORD_PATTERN.findall(text)
+    if not words or text.startswith(FOLLOW_UP_OPENERS):
+        return False
+    if any(word in REFERRING_WORDS for word in words):
+        return False
+    named = matcher is not None and bool(matcher.find_all(question))
+    # "When does the contract expire?" means the contract discussed so far, unless the question names one
+    if "the" in words and not named:
+        return False
+    return len(words) >= min_words or named
+
+
+def entity_matcher(names: Iterable[str]) -> KeywordMatcher:
+    """A matcher for entity names, e.g. every alias collected by QueryRouter.from_directory."""
+    return KeywordMatcher(sorted({name for name in names if name}))
+
+
+class QuestionCondenser:
+    """
+    Condenses follow-up questions with an LLM only when needed, caching the rewrites.
+    """
+
+    def __init__(self, rewrite: Callable[[str, str], str], matcher: Optional[KeywordMatcher] = None,
+                 cache_size: int = 1024, skip_self_contained: bool = True, min_words: int = 4):
+        """
+        Initialize the condenser.
+
+        Args:
+            rewrite: Calls the LLM with (question, chat transcript) and returns the standalone question
+            matcher: Known entity names, passed to is_self_contained
+            cache_size: Maximum number of rewrites remembered (0 disables the cache)
+            skip_self_contained: Whether to skip the LLM for questions judged self-contained
+            min_words: Passed to is_self_contained
+        """
+        self.rewrite = rewrite
+        self.matcher = matcher
+        self.cache_size = cache_size
+        self.skip_self_contained = skip_self_contained
+        self.min_words = min_words
+        self.requests = 0
+        self.skipped_first_turn = 0
+        self.skipped_self_contained = 0
+        self.cache_hits = 0
+        self.llm_calls = 0
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def condense(self, question: str, transcript: str) -> str:
+        """
+        Return the standalone form of a question.
+
+        Args:
+            question: The user's message
+            transcript: The earlier conversation as text ("" for the first turn)
+
+        Returns:
+            The question itself when condensing is skipped, otherwise the (possibly cached) rewrite
+        """
+        with self._lock:
+            self.requests += 1
+            if not transcript:
+                self.skipped_first_turn += 1
+                return question
+            if self.skip_self_contained and is_self_contained(question, self.matcher, self.min_words):
+                self.skipped_self_contained += 1
+                return question
+            key = self.cache_key(question, transcript)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+            self.llm_calls += 1
+
+        standalone = self.rewrite(question, transcript)
+        if self.cache_size:
+            with self._lock:
+                self._cache[key] = standalone
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return standalone
+
+    @staticmethod
+    def cache_key(question: str, transcript: str) -> str:
+        """Hash of the history and the question; the transcript is hashed rather than stored."""
+        history_hash = hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+        return f"{history_hash}:{question.strip()}"
+
+    @property
+    def skip_rate(self) -> float:
+        """Fraction of questions answered without a condense LLM call so far."""
+        return (self.requests - self.llm_calls) / self.requests if self.requests else 0.0
+
+    def summary(self) -> str:
+        """A one-line report of how many condense calls were avoided."""
+        return (f"Condense: {self.llm_calls} LLM calls for {self.requests} questions ({self.skip_rate:.0%} skipped: "
+                f"{self.skipped_first_turn} first turns, {self.skipped_self_contained} self-contained, "
+                f"{self.cache_hits} cached)")
@@ -2,178 +2,421 @@
 # coding: utf-8
 
 # Build a simple RAG knowledge worker for Insurellm employees.
+#
+# The work is split into three commands so that bringing up the chat server doesn't
+# pay for indexing or visualization:
+#   python rag_insurance_company.py build-index   # load, chunk and embed knowledge-base/ into vector_db/
+#   python rag_insurance_company.py serve         # chat with the assistant over the persisted store
+#   python rag_insurance_company.py visualize     # plot the stored embeddings in 2D and 3D (cached projection)
 
 # Import core libraries and environment helpers.
+# Heavier dependencies (LangChain, Gradio, Plotly) are imported by the commands that need them.
 import os
 import glob
+import argparse
 from dotenv import load_dotenv
-import gradio as gr
-
-# Import LangChain components, visualization tooling, and math helpers.
-from langchain.document_loaders import DirectoryLoader, TextLoader
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_chroma import Chroma
-from sklearn.manifold import TSNE
-import numpy as np
-import plotly.graph_objects as go
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
-from langchain_core.callbacks import StdOutCallbackHandler
-
-
-# In[ ]:
 
+# Load credentials and settings from the local .env file, before any setting below is read.
+load_dotenv(override=True)
+os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY', 'your-key-if-not-using-env')
 
 # Configure the target LLM and vector store directory.
 MODEL = "gpt-4o-mini"
 db_name = "vector_db"
+embedding_cache_path = "embedding_cache.sqlite3"
+
+# Chunking: "markdown" splits at headings and list items into chunks of up to CHUNK_TOKENS model tokens, with
+# CHUNK_OVERLAP_TOKENS of overlap only where a section has to be cut (markdown_chunker.py), on CHUNK_WORKERS processes
+# (0 = one per CPU). "character" is the original 1000-character splitter with 200 characters of overlap.
+# Changing these re-embeds the chunks whose text changed on the next build-index.
+CHUNKERS = ("markdown", "character")
+CHUNKER = os.getenv("CHUNKER", "markdown")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "0"))
+
+# Retriever: "hybrid" fuses BM25 keyword search with dense search (hybrid_retriever.py), so exact names and
+# product codes rank well and far fewer chunks are needed; "partitioned" does the same within the doc_type
+# partitions a rule-based router picks for each question (partitioned_retriever.py); "dense" is embedding search alone.
+RETRIEVERS = ("partitioned", "hybrid", "dense")
+RETRIEVER = os.getenv("RETRIEVER", "partitioned")
+
+# Number of chunks retrieved per question; a larger window gives more comprehensive answers.
+RETRIEVAL_K = {"partitioned": 8, "hybrid": 8, "dense": 25}
+
+# Semantic answer cache (semantic_cache.py): a rephrased question whose standalone form is at least this similar
+# to a cached one, and that retrieves the same chunks, gets the cached answer. Set the size to 0 to disable it.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+
+# Each browser session keeps its own history (session_memory.py), trimmed to HISTORY_TOKEN_BUDGET tokens after every
+# turn, or summarized with an extra (cheap) LLM call when SUMMARIZE_HISTORY is enabled. Sessions idle for
+# SESSION_IDLE_SECONDS are forgotten, and the least recently used go first once all histories together exceed
+# SESSION_MEMORY_TOKENS. Up to MAX_CONCURRENT_CHATS sessions are answered at the same time.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+SUMMARIZE_HISTORY = os.getenv("SUMMARIZE_HISTORY", "false").lower() in ("1", "true", "yes")
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+SESSION_MEMORY_TOKENS = int(os.getenv("SESSION_MEMORY_TOKENS", "2000000"))
+MAX_CONCURRENT_CHATS = int(os.getenv("MAX_CONCURRENT_CHATS", "16"))
+
+# Stream answer tokens to the UI once retrieval has finished, at most STREAM_UPDATES_PER_SECOND updates per second.
+# Condense, retrieval, time-to-first-token and generation times are logged for every streamed request.
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "true").lower() in ("1", "true", "yes")
+STREAM_UPDATES_PER_SECOND = float(os.getenv("STREAM_UPDATES_PER_SECOND", "15"))
+
+# Follow-up questions are only rewritten into standalone ones by the LLM when they seem to depend on the conversation
+# (question_condenser.py); set SKIP_SELF_CONTAINED_CONDENSE=false to condense every follow-up. Rewrites are cached
+# per (history, question), up to CONDENSE_CACHE_SIZE of them.
+SKIP_SELF_CONTAINED_CONDENSE = os.getenv("SKIP_SELF_CONTAINED_CONDENSE", "true").lower() in ("1", "true", "yes")
+CONDENSE_CACHE_SIZE = int(os.getenv("CONDENSE_CACHE_SIZE", "1024"))
+
+# Visualization (embedding_projection.py): "pca" plots the leading principal components, "graph" lays out an
+# approximate nearest-neighbour graph (slower to compute, but keeps neighbourhoods together). Projections are cached
+# next to the store and updated incrementally. At most VISUALIZE_MAX_POINTS chunks are plotted, sampled per doc_type.
+VISUALIZE_LAYOUT = os.getenv("VISUALIZE_LAYOUT", "graph")
+VISUALIZE_MAX_POINTS = int(os.getenv("VISUALIZE_MAX_POINTS", "20000"))
+
+# Embedding backend: "openai" (hosted), "local" (sentence-transformers on CPU) or "hashing" (offline, for tests).
+# Each backend gets its own vector store, since their vectors are not comparable.
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "openai")
+
+# Vector store: "chroma", or "numpy" for an in-process exact-search matrix (numpy_store.py) that avoids
+# Chroma's client overhead. NUMPY_STORE_DTYPE (float32, float16 or int8) trades accuracy for memory.
+VECTOR_STORES = ("chroma", "numpy")
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+NUMPY_STORE_DTYPE = os.getenv("NUMPY_STORE_DTYPE", "float32")
+
+# Approximate search for the numpy store (ivf_index.py); 0 lists keeps exact search.
+# Lists and PQ bytes per vector are build parameters, probed lists can be changed at serve time.
+ANN_LISTS = int(os.getenv("ANN_LISTS", "0"))
+ANN_PROBE = int(os.getenv("ANN_PROBE", "8"))
+ANN_PQ_SUBVECTORS = int(os.getenv("ANN_PQ_SUBVECTORS", "0"))
 
-# Load credentials from the local .env file.
-load_dotenv(override=True)
-os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY', 'your-key-if-not-using-env')
-
-# Load markdown documents from the knowledge base and tag their type.
-folders = glob.glob("knowledge-base/*")
 
 def add_metadata(doc, doc_type):
     doc.metadata["doc_type"] = doc_type
     return doc
 
-# Ensure UTF-8 decoding; Windows users can switch to autodetect if required.
-text_loader_kwargs = {"encoding": "utf-8"}
-# text_loader_kwargs = {"autodetect_encoding": True}
-
-documents = []
-for folder in folders:
-    doc_type = os.path.basename(folder)
-    loader = DirectoryLoader(folder, glob="**/*.md", loader_cls=TextLoader, loader_kwargs=text_loader_kwargs)
-    folder_docs = loader.load()
-    documents.extend([add_metadata(doc, doc_type) for doc in folder_docs])
-
-# Split documents into overlapping chunks for robust retrieval.
-text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-chunks = text_splitter.split_documents(documents)
-
-print(f"Total number of chunks: {len(chunks)}")
-print(f"Document types found: {set(doc.metadata['doc_type'] for doc in documents)}")
-
-# Embed the chunks and persist them in Chroma.
-embeddings = OpenAIEmbeddings()
-if os.path.exists(db_name):
-    Chroma(persist_directory=db_name, embedding_function=embeddings).delete_collection()
-vectorstore = Chroma.from_documents(documents=chunks, embedding=embeddings, persist_directory=db_name)
-print(f"Vectorstore created with {vectorstore._collection.count()} documents")
-
-# Inspect vector store dimensions.
-collection = vectorstore._collection
-count = collection.count()
-
-sample_embedding = collection.get(limit=1, include=["embeddings"])["embeddings"][0]
-dimensions = len(sample_embedding)
-print(f"There are {count:,} vectors with {dimensions:,} dimensions in the vector store")
-
-# Prepare a data frame for visualization.
-result = collection.get(include=['embeddings', 'documents', 'metadatas'])
-vectors = np.array(result['embeddings'])
-documents = result['documents']
-metadatas = result['metadatas']
-doc_types = [metadata['doc_type'] for metadata in metadatas]
-colors = [['blue', 'green', 'red', 'orange'][['products', 'employees', 'contracts', 'company'].index(t)] for t in doc_types]
-
-# Plot embeddings with 2D t-SNE.
-tsne = TSNE(n_components=2, random_state=42)
-reduced_vectors = tsne.fit_transform(vectors)
-
-fig = go.Figure(data=[go.Scatter(
-    x=reduced_vectors[:, 0],
-    y=reduced_vectors[:, 1],
-    mode='markers',
-    marker=dict(size=5, color=colors, opacity=0.8),
-    text=[f"Type: {t}<br>Text: {d[:100]}..." for t, d in zip(doc_types, documents)],
-    hoverinfo='text'
-)])
-
-fig.update_layout(
-    title='2D Chroma Vector Store Visualization',
-    scene=dict(xaxis_title='x',yaxis_title='y'),
-    width=800,
-    height=600,
-    margin=dict(r=20, b=10, l=10, t=40)
-)
-
-fig.show()
-
-
-# Plot embeddings with 3D t-SNE.
-tsne = TSNE(n_components=3, random_state=42)
-reduced_vectors = tsne.fit_transform(vectors)
-
-fig = go.Figure(data=[go.Scatter3d(
-    x=reduced_vectors[:, 0],
-    y=reduced_vectors[:, 1],
-    z=reduced_vectors[:, 2],
-    mode='markers',
-    marker=dict(size=5, color=colors, opacity=0.8),
-    text=[f"Type: {t}<br>Text: {d[:100]}..." for t, d in zip(doc_types, documents)],
-    hoverinfo='text'
-)])
-
-fig.update_layout(
-    title='3D Chroma Vector Store Visualization',
-    scene=dict(xaxis_title='x', yaxis_title='y', zaxis_title='z'),
-    width=900,
-    height=700,
-    margin=dict(r=20, b=10, l=10, t=40)
-)
-
-fig.show()
-
-
-# Build the conversational retrieval chain.
-llm = ChatOpenAI(temperature=0.7, model_name=MODEL)
-memory = ConversationBufferMemory(memory_key='chat_history', return_messages=True)
-retriever = vectorstore.as_retriever()
-conversation_chain = ConversationalRetrievalChain.from_llm(llm=llm, retriever=retriever, memory=memory)
-
-# Run a quick smoke test against the chain.
-query = "Please explain what Insurellm is in a couple of sentences"
-result = conversation_chain.invoke({"question": query})
-print(result["answer"])
-
-# Reset memory before exposing the chat UI.
-memory = ConversationBufferMemory(memory_key='chat_history', return_messages=True)
-conversation_chain = ConversationalRetrievalChain.from_llm(llm=llm, retriever=retriever, memory=memory)
-
-# Bridge the chain into a Gradio chat handler.
-def chat(question, history):
-    result = conversation_chain.invoke({"question": question})
-    return result["answer"]
-
-# Launch the Gradio demo.
-view = gr.ChatInterface(chat, type="messages").launch(inbrowser=True)
-
-# Inspect callback traces for a specific question.
-llm = ChatOpenAI(temperature=0.7, model_name=MODEL)
-memory = ConversationBufferMemory(memory_key='chat_history', return_messages=True)
-retriever = vectorstore.as_retriever()
-conversation_chain = ConversationalRetrievalChain.from_llm(llm=llm, retriever=retriever, memory=memory, callbacks=[StdOutCallbackHandler()])
-
-query = "Who received the prestigious IIOTY award in 2023?"
-result = conversation_chain.invoke({"question": query})
-answer = result["answer"]
-print("\nAnswer:", answer)
-
-# Rebuild the chain with a larger retrieval window for comprehensive answers.
-llm = ChatOpenAI(temperature=0.7, model_name=MODEL)
-memory = ConversationBufferMemory(memory_key='chat_history', return_messages=True)
-retriever = vectorstore.as_retriever(search_kwargs={"k": 25})
-conversation_chain = ConversationalRetrievalChain.from_llm(llm=llm, retriever=retriever, memory=memory)
-
-# Refresh the chat handler for the new retriever settings.
-def chat(question, history):
-    result = conversation_chain.invoke({"question": question})
-    return result["answer"]
-
-# Relaunch the Gradio interface with the updated retriever.
-view = gr.ChatInterface(chat, type="messages").launch(inbrowser=True)
+
+def load_documents():
+    """Load markdown documents from the knowledge base and tag their type."""
+    from langchain.document_loaders import DirectoryLoader, TextLoader
+
+    # Ensure UTF-8 decoding; Windows users can switch to autodetect if required.
+    text_loader_kwargs = {"encoding": "utf-8"}
+    # text_loader_kwargs = {"autodetect_encoding": True}
+
+    documents = []
+    for folder in glob.glob("knowledge-base/*"):
+        doc_type = os.path.basename(folder)
+        loader = DirectoryLoader(folder, glob="**/*.md", loader_cls=TextLoader, loader_kwargs=text_loader_kwargs)
+        folder_docs = loader.load()
+        documents.extend([add_metadata(doc, doc_type) for doc in folder_docs])
+    return documents
+
+
+def split_documents(documents, chunker=CHUNKER):
+    """Split documents into chunks for retrieval: along their markdown structure, or by characters."""
+    if chunker == "character":
+        from langchain.text_splitter import CharacterTextSplitter
+
+        text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        return text_splitter.split_documents(documents)
+
+    from markdown_chunker import MarkdownChunker
+
+    return MarkdownChunker(CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, model=MODEL, workers=CHUNK_WORKERS).split_documents(documents)
+
+
+def store_directory(backend, store="chroma"):
+    """Return the vector store directory for an embeddings backend and store type."""
+    directory = db_name if backend == "openai" else f"{db_name}_{backend}"
+    return directory if store == "chroma" else f"{directory}_{store}"
+
+
+def get_embeddings(backend):
+    """Return the embeddings used for both indexing and querying, backed by the on-disk cache."""
+    from local_embeddings import make_embeddings
+    from embedding_cache import CachedEmbeddings
+
+    return CachedEmbeddings(make_embeddings(backend), embedding_cache_path)
+
+
+def open_vectorstore(embeddings, backend, store="chroma"):
+    """Open the persisted vector store (created empty if it doesn't exist yet)."""
+    if store == "numpy":
+        from numpy_store import NumpyVectorStore
+        vectorstore = NumpyVectorStore(embeddings, path=store_directory(backend, store), dtype=NUMPY_STORE_DTYPE)
+        if vectorstore.ann is not None:
+            vectorstore.ann.n_probe = ANN_PROBE
+        return vectorstore
+
+    from langchain_chroma import Chroma
+
+    return Chroma(persist_directory=store_directory(backend), embedding_function=embeddings)
+
+
+def build_index(backend, store="chroma", chunker=CHUNKER):
+    """Embed new or changed chunks into the persisted store; unchanged chunks are skipped."""
+    from incremental_index import sync_vectorstore
+    from ingestion import RateLimitedIngestor, chroma_writer
+
+    documents = load_documents()
+    chunks = split_documents(documents, chunker)
+    print(f"Total number of chunks: {len(chunks)}")
+    print(f"Document types found: {set(doc.metadata['doc_type'] for doc in documents)}")
+
+    # Delete the vector_db folder to force a full rebuild.
+    # Vectors are cached on disk by model and text, so even a full rebuild only embeds text never seen before.
+    embeddings = get_embeddings(backend)
+    vectorstore = open_vectorstore(embeddings, backend, store)
+    directory = store_directory(backend, store)
+    os.makedirs(directory, exist_ok=True)
+    # New chunks are embedded by concurrent requests that back off on rate limits and are written as they arrive.
+    writer = vectorstore.add_vectors if store == "numpy" else chroma_writer(vectorstore)
+    ingestor = RateLimitedIngestor(embeddings, writer, batch_size=128, max_concurrency=8)
+    save = None
+    if store == "numpy":
+        index = None
+        if ANN_LISTS and chunks:
+            from ivf_index import IVFIndex
+            index = IVFIndex(n_lists=ANN_LISTS, n_probe=ANN_PROBE, pq_subvectors=ANN_PQ_SUBVECTORS)
+            # Fail on a bad ANN_PQ_SUBVECTORS before embedding; the probe vector is cached for the sync
+            index.check_dimensions(vectorstore.dimensions or len(embeddings.embed_documents([chunks[0].page_content])[0]))
+
+        def save():
+            if index is not None and len(vectorstore):
+                vectorstore.build_ann(index)
+            else:
+                vectorstore.ann = None
+            vectorstore.save()
+
+    sync = sync_vectorstore(vectorstore, chunks, os.path.join(directory, "manifest.json"), ingestor=ingestor, save=save)
+    print(f"Vectorstore synced: {sync.added} added, {sync.removed} removed, {sync.unchanged} unchanged")
+    if ingestor.stats is not None:
+        print(ingestor.stats.summary())
+    print(embeddings.summary())
+
+    # Inspect vector store dimensions.
+    count = len(vectorstore.get(include=[])["ids"])
+    sample_embedding = vectorstore.get(limit=1, include=["embeddings"])["embeddings"][0]
+    dimensions = len(sample_embedding)
+    print(f"There are {count:,} vectors with {dimensions:,} dimensions in the vector store")
+
+
+def visualize(backend, store="chroma", layout=VISUALIZE_LAYOUT, max_points=VISUALIZE_MAX_POINTS, refresh=False):
+    """Plot the stored embeddings in 2D and 3D from a cached, incrementally updated projection."""
+    import plotly.graph_objects as go
+    from embedding_projection import Projection, downsample, iter_pages, manifest_key
+    from incremental_index import load_manifest
+
+    vectorstore = open_vectorstore(get_embeddings(backend), backend, store)
+    directory = store_directory(backend, store)
+
+    # The manifest written by build-index lists every chunk and its type, so no vectors are read to check the cache.
+    manifest = load_manifest(os.path.join(directory, "manifest.json"))
+    if manifest:
+        doc_types = {chunk_id: entry.get("doc_type") for chunk_id, entry in manifest.items()}
+    else:
+        doc_types = {}
+        for page in iter_pages(vectorstore, include=["metadatas"]):
+            doc_types.update((chunk_id, (metadata or {}).get("doc_type")) for chunk_id, metadata in zip(page["ids"], page["metadatas"]))
+    if not doc_types:
+        print("The vector store is empty; run `python rag_insurance_company.py build-index` first.")
+        return
+
+    # Reuse the projection saved by the last run; only chunks added since then are read from the store and projected.
+    projection_path = os.path.join(directory, "projection.npz")
+    projection = None if refresh else Projection.load(projection_path)
+    # What is on disk, read before update() changes the projection in place
+    saved = (projection.key, set(projection.layouts)) if projection is not None else None
+    if projection is None:
+        projection = Projection.fit(vectorstore)
+    elif projection.key != manifest_key(doc_types):
+        projection = projection.update(vectorstore, list(doc_types))
+    coordinates = {dims: projection.coordinates(layout, dims) for dims in (2, 3)}
+    if saved != (projection.key, set(projection.layouts)):
+        projection.save(projection_path)
+    print(projection.summary())
+
+    # Plot a sample that keeps each document type's share; only the plotted chunks' texts are fetched.
+    labels = [doc_types.get(chunk_id) or "unknown" for chunk_id in projection.ids]
+    shown = downsample(labels, max_points)
+    shown_ids = [projection.ids[row] for row in shown]
+    texts = {}
+    for page in iter_pages(vectorstore, include=["documents"], ids=shown_ids):
+        texts.update(zip(page["ids"], page["documents"]))
+    if len(shown) < len(labels):
+        print(f"Plotting {len(shown):,} of {len(labels):,} chunks")
+    colors = {'products': 'blue', 'employees': 'green', 'contracts': 'red', 'company': 'orange'}
+
+    def traces(dims):
+        """One WebGL scatter trace per document type."""
+        for doc_type in sorted(set(labels[row] for row in shown)):
+            rows = [row for row in shown if labels[row] == doc_type]
+            points = coordinates[dims][rows]
+            common = dict(
+                name=doc_type,
+                mode='markers',
+                marker=dict(size=5 if len(shown) < 5000 else 3, color=colors.get(doc_type, 'gray'), opacity=0.8),
+                text=[f"Type: {doc_type}<br>Text: {texts.get(projection.ids[row], '')[:100]}..." for row in rows],
+                hoverinfo='text'
+            )
+            if dims == 2:
+                yield go.Scattergl(x=points[:, 0], y=points[:, 1], **common)
+            else:
+                yield go.Scatter3d(x=points[:, 0], y=points[:, 1], z=points[:, 2], **common)
+
+    # Plot embeddings in 2D.
+    fig = go.Figure(data=list(traces(2)))
+    fig.update_layout(
+        title=f'2D Vector Store Visualization ({layout} layout)',
+        width=800,
+        height=600,
+        margin=dict(r=20, b=10, l=10, t=40)
+    )
+    fig.show()
+
+    # Plot embeddings in 3D.
+    fig = go.Figure(data=list(traces(3)))
+    fig.update_layout(
+        title=f'3D Vector Store Visualization ({layout} layout)',
+        scene=dict(xaxis_title='x', yaxis_title='y', zaxis_title='z'),
+        width=900,
+        height=700,
+        margin=dict(r=20, b=10, l=10, t=40)
+    )
+    fig.show()
+
+
+def serve(backend, store="chroma", retriever_type=RETRIEVER, k=None, trace=False, stream=STREAM_ANSWERS):
+    """Open the persisted store and launch the Gradio chat UI over a conversational retrieval chain."""
+    import gradio as gr
+    from langchain_openai import ChatOpenAI
+    from langchain.chains import ConversationalRetrievalChain
+    from langchain_core.callbacks import StdOutCallbackHandler
+    from history_manager import HistoryManager
+    from session_memory import SessionStore
+
+    embeddings = get_embeddings(backend)
+    vectorstore = open_vectorstore(embeddings, backend, store)
+    if not vectorstore.get(limit=1, include=[])["ids"]:
+        print("The vector store is empty; run `python rag_insurance_company.py build-index` first.")
+
+    # Build the conversational retrieval chain.
+    llm = ChatOpenAI(temperature=0.7, model_name=MODEL)
+    k = k or RETRIEVAL_K[retriever_type]
+    from query_router import QueryRouter
+    router = QueryRouter.from_directory("knowledge-base")
+    if retriever_type == "partitioned":
+        from partitioned_retriever import PartitionedIndex, PartitionedRetriever
+        index = PartitionedIndex(vectorstore, embeddings, router)
+        retriever = PartitionedRetriever(index=index, k=k)
+    elif retriever_type == "hybrid":
+        from hybrid_retriever import HybridIndex, HybridRetriever
+        retriever = HybridRetriever(index=HybridIndex(vectorstore), k=k)
+    else:
+        retriever = vectorstore.as_retriever(search_kwargs={"k": k})
+    # Callback traces show the condensed question and the retrieved chunks for each request.
+    callbacks = [StdOutCallbackHandler()] if trace else None
+    conversation_chain = ConversationalRetrievalChain.from_llm(llm=llm, retriever=retriever, callbacks=callbacks)
+
+    # Conversation memory is kept per browser session rather than in one buffer shared by every user.
+    summarizer_llm = ChatOpenAI(temperature=0, model_name=MODEL)
+
+    def summarize_history(messages):
+        """Condense earlier conversation turns into a few sentences for the history manager."""
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        return summarizer_llm.invoke([
+            ("system", "Summarize this conversation in at most five sentences, keeping names, numbers and facts."),
+            ("user", transcript),
+        ]).content
+
+    history_manager = HistoryManager(token_budget=HISTORY_TOKEN_BUDGET, model=MODEL,
+                                     summarizer=summarize_history if SUMMARIZE_HISTORY else None)
+    sessions = SessionStore(history_manager, idle_timeout=SESSION_IDLE_SECONDS, max_sessions=MAX_SESSIONS,
+                            max_total_tokens=SESSION_MEMORY_TOKENS)
+
+    # Answer through the chain's steps so repeated questions can be served from the semantic cache.
+    # Known employee, product and client names let short follow-ups like "Carllm pricing?" skip condensing.
+    from answer_pipeline import AnswerPipeline
+    from question_condenser import entity_matcher
+    from semantic_cache import SemanticAnswerCache
+    cache = SemanticAnswerCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE) if SEMANTIC_CACHE_SIZE else None
+    entities = entity_matcher(name for aliases in router.names.values() for name in aliases)
+    pipeline = AnswerPipeline(conversation_chain, embeddings, cache, callbacks, condense_cache_size=CONDENSE_CACHE_SIZE,
+                              skip_self_contained=SKIP_SELF_CONTAINED_CONDENSE, entities=entities)
+
+    def report():
+        """Print condense statistics after a turn, and memory and routing statistics when tracing."""
+        print(pipeline.condenser.summary())
+        if trace:
+            print(sessions.summary())
+            if retriever_type == "partitioned":
+                print(index.summary())
+
+    # Bridge the pipeline into a Gradio chat handler; Gradio fills in the request, which identifies the session.
+    # The UI's history decides which turns exist, so Clear, Retry and Undo also reset what the model sees.
+    def chat(question, history, request: gr.Request):
+        session = sessions.session(request.session_hash if request else None)
+        with session.lock:
+            sessions.sync(session, history)
+            answer = pipeline.answer(question, session.messages)
+            sessions.record(session, question, answer)
+        report()
+        return answer
+
+    # Streaming variant: Gradio shows each yielded prefix as the answer grows.
+    def stream_chat(question, history, request: gr.Request):
+        session = sessions.session(request.session_hash if request else None)
+        with session.lock:
+            sessions.sync(session, history)
+            answer = ""
+            for answer in pipeline.stream(question, session.messages, STREAM_UPDATES_PER_SECOND):
+                yield answer
+            sessions.record(session, question, answer)
+        report()
+
+    # Launch the Gradio demo.
+    handler = stream_chat if stream else chat
+    gr.ChatInterface(handler, type="messages", concurrency_limit=MAX_CONCURRENT_CHATS).launch(inbrowser=True)
+
+
+def main():
+    from local_embeddings import EMBEDDING_BACKENDS
+
+    parser = argparse.ArgumentParser(description="Insurellm RAG knowledge worker")
+    parser.add_argument("--embeddings", choices=EMBEDDING_BACKENDS, default=EMBEDDINGS_BACKEND,
+                        help="Embedding backend (default: $EMBEDDINGS_BACKEND or openai)")
+    parser.add_argument("--store", choices=VECTOR_STORES, default=VECTOR_STORE,
+                        help="Vector store (default: $VECTOR_STORE or chroma)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build-index", help="Load, chunk and embed knowledge-base/ into the vector store")
+    build_parser.add_argument("--chunker", choices=CHUNKERS, default=CHUNKER,
+                              help="Chunking method (default: $CHUNKER or markdown)")
+    serve_parser = commands.add_parser("serve", help="Launch the Gradio chat UI over the persisted vector store")
+    serve_parser.add_argument("--retriever", choices=RETRIEVERS, default=RETRIEVER,
+                              help="Retrieval method (default: $RETRIEVER or partitioned)")
+    serve_parser.add_argument("--k", type=int, help="Chunks retrieved per question (default: 8, or 25 for dense)")
+    serve_parser.add_argument("--trace", action="store_true", help="Print callback traces for every request")
+    serve_parser.add_argument("--no-stream", dest="stream", action="store_false", default=STREAM_ANSWERS,
+                              help="Send each answer in one piece instead of streaming it")
+    visualize_parser = commands.add_parser("visualize", help="Plot the stored embeddings in 2D and 3D")
+    visualize_parser.add_argument("--layout", choices=("pca", "graph"), default=VISUALIZE_LAYOUT,
+                                  help="Projection layout (default: $VISUALIZE_LAYOUT or graph)")
+    visualize_parser.add_argument("--max-points", type=int, default=VISUALIZE_MAX_POINTS,
+                                  help="Most chunks plotted; larger stores are sampled per doc_type")
+    visualize_parser.add_argument("--refresh", action="store_true", help="Refit the projection instead of updating it")
+    args = parser.parse_args()
+
+    if args.command == "build-index":
+        build_index(args.embeddings, args.store, args.chunker)
+    elif args.command == "serve":
+        serve(args.embeddings, args.store, args.retriever, k=args.k, trace=args.trace, stream=args.stream)
+    elif args.command == "visualize":
+        visualize(args.embeddings, args.store, args.layout, args.max_points, args.refresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Response Cache Module
+
+This module caches complete chat answers so that repeated questions can be
+answered without another LLM call. Entries are keyed on the normalized question,
+a hash of everything else sent with it (history and injected context) and the
+model name, evicted least-recently-used, expire after a TTL and can optionally
+be persisted to a SQLite file.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional, Tuple
+
+NON_WORD_PATTERN = re.compile(r"[^\w]+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase a question and collapse punctuation and whitespace, so trivial variants share a key."""
+    return NON_WORD_PATTERN.sub(" ", question.lower()).strip()
+
+
+def stream_cached(answer: str, chunk_chars: int = 24) -> Iterator[str]:
+    """
+    Replay a cached answer the way a streamed answer is yielded to Gradio.
+
+    Args:
+        answer: The cached answer
+        chunk_chars: Characters added per yield
+
+    Yields:
+        Progressively longer prefixes of the answer, ending with the full answer
+    """
+    for end in range(chunk_chars, len(answer), chunk_chars):
+        yield answer[:end]
+    yield answer
+
+
+class ResponseCache:
+    """
+    A thread-safe LRU cache of answers with a TTL and optional on-disk persistence.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, path: Optional[str] = None):
+        """
+        Initialize the cache, loading any persisted entries that have not expired.
+
+        Args:
+            max_entries: Maximum number of answers held in memory
+            ttl: Seconds an answer stays valid
+            path: SQLite file to persist answers to, or None to keep them in memory only
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, answer TEXT, created REAL)")
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - ttl,))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT key, answer, created FROM responses ORDER BY created DESC LIMIT ?", (max_entries,)
+            ).fetchall()
+            for key, answer, created in reversed(rows):
+                self._entries[key] = (answer, created)
+
+    @staticmethod
+    def key(question: str, context: str, model: str) -> str:
+        """
+        Build the cache key for a question.
+
+        Args:
+            question: The user's question as typed
+            context: Everything else sent to the model with it (history and retrieved context)
+            model: The model name
+
+        Returns:
+            A hex digest identifying the request
+        """
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        return hashlib.sha256("\0".join((model, normalize_question(question), context_hash)).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up an answer.
+
+        Args:
+            key: A key from key()
+
+        Returns:
+            The cached answer, or None on a miss or if the entry has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl:
+                self._remove(key)
+                if self._db is not None:
+                    self._db.commit()
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, answer: str) -> None:
+        """
+        Store an answer, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key: A key from key()
+            answer: The complete answer
+        """
+        created = time.time()
+        with self._lock:
+            self._entries[key] = (answer, created)
+            self._entries.move_to_end(key)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, answer, created))
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            if self._db is not None:
+                self._db.commit()
+
+    def _remove(self, key: str) -> None:
+        """Drop an entry from memory and disk. The caller must hold the lock."""
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
@@ -0,0 +1,131 @@
+"""
+Semantic Cache Module
+
+This module caches answers by the meaning of the standalone question rather
+than its exact wording, so "Who won IIOTY 2023?" and "Which employee got the
+IIOTY award in 2023?" share one answer. A cached answer is only reused when the
+new question's embedding is within a cosine threshold of the cached question
+AND the new question retrieves exactly the chunks the cached answer was
+written from, so an edited or re-indexed knowledge base never serves a stale
+answer. Entries are evicted least-recently-used and expire after a TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+
+class CachedAnswer(NamedTuple):
+    """A cached answer and what it was generated from."""
+    question: str
+    answer: str
+    chunk_ids: frozenset
+    seconds: float
+    created: float
+
+
+class SemanticAnswerCache:
+    """
+    A thread-safe LRU cache of answers looked up by question-embedding similarity.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1024, ttl: float = 24 * 3600.0):
+        """
+        Initialize an empty cache.
+
+        Args:
+            threshold: Minimum cosine similarity between questions for a hit
+            max_entries: Maximum number of answers held
+            ttl: Seconds an answer stays valid
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self._vectors: Optional[np.ndarray] = None
+        self._slots: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, question_vector: Iterable[float], chunk_ids: Iterable[str]) -> Optional[CachedAnswer]:
+        """
+        Look up an answer for a question.
+
+        Args:
+            question_vector: Embedding of the standalone question
+            chunk_ids: IDs of the chunks retrieved for the question
+
+        Returns:
+            The most similar cached answer that clears the threshold and was generated from the same
+            chunks, or None
+        """
+        vector = _unit(question_vector)
+        chunk_ids = frozenset(chunk_ids)
+        now = time.time()
+        with self._lock:
+            if self._slots:
+                slots = np.fromiter(self._slots, dtype=np.int64)
+                scores = self._vectors[slots] @ vector
+                for position in np.argsort(-scores):
+                    if scores[position] < self.threshold:
+                        break
+                    slot = int(slots[position])
+                    entry = self._slots[slot]
+                    if now - entry.created > self.ttl:
+                        del self._slots[slot]
+                        self._free.append(slot)
+                        continue
+                    if entry.chunk_ids == chunk_ids:
+                        self._slots.move_to_end(slot)
+                        self.hits += 1
+                        self.seconds_saved += entry.seconds
+                        return entry
+            self.misses += 1
+            return None
+
+    def put(self, question: str, question_vector: Iterable[float], chunk_ids: Iterable[str], answer: str,
+            seconds: float) -> None:
+        """
+        Store an answer.
+
+        Args:
+            question: The standalone question
+            question_vector: Its embedding
+            chunk_ids: IDs of the chunks the answer was generated from
+            answer: The answer
+            seconds: How long generating the answer took (credited to seconds_saved on every hit)
+        """
+        vector = _unit(question_vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot, _ = self._slots.popitem(last=False)
+            self._vectors[slot] = vector
+            self._slots[slot] = CachedAnswer(question, answer, frozenset(chunk_ids), seconds, time.time())
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache so far."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        """A one-line report of cache effectiveness."""
+        return (f"Semantic cache: {self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), "
+                f"{self.seconds_saved:.1f}s of answer generation saved")
+
+
+def _unit(vector: Iterable[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
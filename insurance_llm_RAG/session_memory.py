@@ -0,0 +1,163 @@
+"""
+Session Memory Module
+
+This module keeps a separate, bounded conversation history for every chat
+session instead of one buffer shared by all users. After each turn a session's
+history is compacted to its token budget by a HistoryManager (older turns
+dropped or summarized), idle sessions are evicted, and the least recently used
+sessions are evicted whenever the total history held exceeds a global cap.
+Each session has its own lock, so turns of one session run in order while
+different sessions answer concurrently. When the chat UI's history no longer
+matches a session's (after Clear, Retry or Undo), the session is rebuilt from it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from history_manager import HistoryManager
+
+
+class Session:
+    """The history of one chat session."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.messages: List[Dict[str, str]] = []
+        self.tokens = 0
+        # Turns recorded, including any compacted away, to compare with the UI's history
+        self.turns = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    """
+    Per-session chat histories with token budgets, idle eviction and a global cap.
+    """
+
+    def __init__(self, history_manager: HistoryManager, idle_timeout: float = 1800.0, max_sessions: int = 1000,
+                 max_total_tokens: int = 2_000_000):
+        """
+        Initialize an empty store.
+
+        Args:
+            history_manager: Compacts each session's history to its token budget after every turn
+            idle_timeout: Seconds after its last turn that a session is forgotten
+            max_sessions: Most sessions held at once
+            max_total_tokens: Most history tokens held across all sessions
+        """
+        self.history_manager = history_manager
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_total_tokens = max_total_tokens
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._total_tokens = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def total_tokens(self) -> int:
+        return self._total_tokens
+
+    def session(self, session_id: Optional[str]) -> Session:
+        """
+        Return a session, creating it if it is new or was evicted.
+
+        Args:
+            session_id: A stable ID for the browser session (e.g. gr.Request.session_hash);
+                None gets a throwaway session that is not stored
+
+        Returns:
+            The session; hold its lock while answering so its turns stay in order
+        """
+        if session_id is None:
+            return Session("")
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            self._enforce_limits(keep=session_id)
+            return session
+
+    def record(self, session: Session, question: str, answer: str) -> None:
+        """
+        Add a turn to a session and compact its history to the budget.
+
+        Args:
+            session: The session the turn belongs to
+            question: The user's message
+            answer: The assistant's answer
+        """
+        history = session.messages + [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        compacted = self.history_manager.compact(history)
+        with self._lock:
+            session.messages = compacted.messages
+            session.last_used = time.monotonic()
+            if self._sessions.get(session.session_id) is session:
+                self._total_tokens += compacted.tokens - session.tokens
+                self._enforce_limits(keep=session.session_id)
+            session.tokens = compacted.tokens
+            session.turns += 1
+
+    def sync(self, session: Session, history: List[Dict[str, str]]) -> bool:
+        """
+        Rebuild a session from the chat UI's history if they disagree on the number of turns.
+
+        The UI drops turns on Clear, Retry and Undo; without this the model would still see them.
+
+        Args:
+            session: The session about to be answered
+            history: The messages the UI shows ({"role", "content"} dicts, oldest first)
+
+        Returns:
+            True if the session was rebuilt
+        """
+        turns = sum(1 for message in history if message.get("role") == "user")
+        if turns == session.turns:
+            return False
+        messages = [{"role": message["role"], "content": message["content"]} for message in history
+                    if isinstance(message.get("content"), str)]
+        compacted = self.history_manager.compact(messages)
+        with self._lock:
+            session.messages = compacted.messages
+            if self._sessions.get(session.session_id) is session:
+                self._total_tokens += compacted.tokens - session.tokens
+            session.tokens = compacted.tokens
+            session.turns = turns
+        return True
+
+    def summary(self) -> str:
+        """A one-line report of memory use."""
+        return (f"Sessions: {len(self._sessions)} active holding {self._total_tokens:,} history tokens, "
+                f"{self.evicted} evicted")
+
+    def _evict_idle(self) -> None:
+        """Drop sessions unused for longer than idle_timeout; the least recently used come first."""
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > cutoff:
+                break
+            self._remove(session.session_id)
+
+    def _enforce_limits(self, keep: str) -> None:
+        """Drop least recently used sessions (never `keep`) until within both caps."""
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions and self._total_tokens <= self.max_total_tokens:
+                break
+            if session_id != keep:
+                self._remove(session_id)
+
+    def _remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._total_tokens -= session.tokens
+        self.evicted += 1
@@ -0,0 +1,110 @@
+"""
+Streaming Module
+
+This module turns a stream of text deltas from the LLM into the cumulative
+updates Gradio expects, without rebuilding the answer string on every delta,
+and throttles how often updates are pushed to the UI. It also measures
+time-to-first-token and generation throughput.
+"""
+
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Union
+
+
+class ThrottledStream:
+    """
+    Iterates over the growing answer text, yielding at most max_updates_per_second
+    times (and only once min_chars new characters have arrived), plus once at the end.
+    """
+
+    def __init__(self, deltas: Union[Iterable[str], AsyncIterable[str]], max_updates_per_second: float = 20.0,
+                 min_chars: int = 1, started_at: Optional[float] = None):
+        """
+        Wrap a stream of deltas.
+
+        Args:
+            deltas: Text fragments in arrival order, as a sync or async iterable; empty fragments are ignored
+            max_updates_per_second: Upper bound on UI updates (0 for no time limit)
+            min_chars: Minimum number of new characters before an update is sent
+            started_at: time.perf_counter() value when the request was sent, for time-to-first-token
+        """
+        self._deltas = deltas
+        self._min_interval = 1.0 / max_updates_per_second if max_updates_per_second > 0 else 0.0
+        self._min_chars = min_chars
+        self._parts: List[str] = []
+        self._text = ""
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.tokens = 0
+        self.updates = 0
+        self._last_update: Optional[float] = None
+        self._pending_chars = 0
+
+    @property
+    def text(self) -> str:
+        """The full text received so far."""
+        if self._parts:
+            self._text += "".join(self._parts)
+            self._parts.clear()
+        return self._text
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from the request to the first non-empty delta."""
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation rate after the first token, counting one token per delta."""
+        if self.first_token_at is None or self.finished_at is None or self.finished_at <= self.first_token_at:
+            return None
+        return (self.tokens - 1) / (self.finished_at - self.first_token_at)
+
+    def __iter__(self) -> Iterator[str]:
+        for delta in self._deltas:
+            if self._push(delta):
+                yield self.text
+        if self._finish():
+            yield self.text
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for delta in self._deltas:
+            if self._push(delta):
+                yield self.text
+        if self._finish():
+            yield self.text
+
+    def _push(self, delta: Optional[str]) -> bool:
+        """Record a delta and return True if an update is due."""
+        if not delta:
+            return False
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.tokens += 1
+        self._parts.append(delta)
+        self._pending_chars += len(delta)
+        if self._last_update is not None and (now - self._last_update < self._min_interval or self._pending_chars < self._min_chars):
+            return False
+        self._last_update = now
+        self._pending_chars = 0
+        self.updates += 1
+        return True
+
+    def _finish(self) -> bool:
+        """Mark the stream complete and return True if a final update is due."""
+        self.finished_at = time.perf_counter()
+        if self._pending_chars or self.updates == 0:
+            self._pending_chars = 0
+            self.updates += 1
+            return True
+        return False
+
+    def summary(self) -> str:
+        """A one-line report of the stream's latency and throughput."""
+        ttft = self.time_to_first_token
+        rate = self.tokens_per_second
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+        rate_text = f"{rate:.1f} tokens/s" if rate is not None else "n/a"
+        return f"{self.tokens} tokens in {self.updates} updates, time to first token {ttft_text}, {rate_text}"
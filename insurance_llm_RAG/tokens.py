@@ -0,0 +1,69 @@
+"""
+Token Counting Module
+
+This module counts and truncates text in model tokens. It uses tiktoken when it
+is installed and otherwise falls back to a characters-per-token estimate, which
+is close enough for budgeting prompts.
+"""
+
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Rough average for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """Return the tiktoken encoding for a model, defaulting to o200k_base."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Args:
+        text: The text to measure
+        model: Model whose tokenizer should be used
+
+    Returns:
+        The number of tokens (estimated if tiktoken is not installed)
+    """
+    if not text:
+        return 0
+    if tiktoken is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """
+    Cut text down to at most max_tokens tokens.
+
+    Args:
+        text: The text to truncate
+        max_tokens: Maximum number of tokens to keep
+        model: Model whose tokenizer should be used
+
+    Returns:
+        The leading part of the text that fits in the budget
+    """
+    if max_tokens <= 0:
+        return ""
+    if tiktoken is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    encoding = _encoding(model)
+    token_ids = encoding.encode(text, disallowed_special=())
+    if len(token_ids) <= max_tokens:
+        return text
+    return encoding.decode(token_ids[:max_tokens])